@@ -0,0 +1,106 @@
+"""
+Ajustes que cambian de un día a otro: la calibración guardada en el hub y
+la compensación de la batería.
+"""
+from pybricks.hubs import PrimeHub
+from pybricks.tools import wait
+from ustruct import pack_into, unpack_from, calcsize
+
+
+class CompensacionBateria:
+    """
+    Compensa las esperas de empuje de tiempo fijo y el tope de tiempo de
+    cuadrar con la pared según la tensión de la batería, que se mide antes
+    de cada salida. Así se afina una vez con la batería llena y vale igual
+    con la batería a medias. Los duty_limit no se tocan: Pybricks ya los
+    convierte en un límite que tiene en cuenta la tensión, y subirlos solo
+    haría empujar más fuerte contra los topes
+    """
+    def __init__(self, hub: PrimeHub, *, tabla: tuple = None, muestras: int = 10):
+        self.hub = hub
+        # Filas (mV, factor) de menos a más tensión; entre filas se interpola
+        self.tabla = ((7400, 1.12), (7800, 1.06), (8300, 1.0)) if tabla is None else tabla
+        self.muestras = muestras
+        self.tension = None
+        self.factor = 1
+
+    def mide(self) -> float:
+        # Con los motores parados, si no la tensión sale más baja
+        suma = 0
+        for _ in range(self.muestras):
+            suma += self.hub.battery.voltage()
+            wait(1)
+        self.tension = suma // self.muestras
+        self.factor = self.factor_para(self.tension)
+        return self.factor
+
+    def factor_para(self, tension: int) -> float:
+        tabla = self.tabla
+        if tension <= tabla[0][0]:
+            return tabla[0][1]
+        for i in range(1, len(tabla)):
+            if tension <= tabla[i][0]:
+                tension_0, factor_0 = tabla[i - 1]
+                tension_1, factor_1 = tabla[i]
+                return factor_0 + (factor_1 - factor_0) * (tension - tension_0) / (tension_1 - tension_0)
+        return tabla[-1][1]
+
+    def ms(self, ms: int) -> int:
+        # Para las esperas en las que el robot empuja durante un tiempo fijo
+        return int(ms * self.factor)
+
+
+class Calibracion:
+    """
+    Valores que se afinan en la alfombra, guardados en hub.system.storage()
+    detrás del byte del teatro: versión, número de campos, los campos como
+    enteros (valor * escala) y una suma de comprobación. Se leen de una vez
+    al encender; si no hay nada o no cuadra se usan los valores por defecto
+    """
+    DIRECCION = 8
+    VERSION = 1
+    # nombre, valor por defecto, escala, paso al editar (0 = no se edita),
+    # mínimo y máximo (valor * escala tiene que caber en un "H")
+    CAMPOS = (
+        ("diametro", 62.4, 10, 1, 40, 100),
+        ("eje", 110, 10, 1, 50, 250),
+        ("factor_recta", 1.5, 100, 5, 0.1, 5),
+        ("factor_aceleracion", 1, 100, 5, 0.1, 5),
+        ("factor_giro", 1, 100, 5, 0.1, 5),
+        ("factor_aceleracion_giro", 0.75, 100, 5, 0.1, 5),
+        ("duty_1", 50, 1, 5, 1, 100),
+        ("duty_2", 50, 1, 5, 1, 100),
+        ("duty_3", 80, 1, 5, 1, 100),
+        # Lo pone calibra_color(); 101 = sin calibrar
+        ("umbral_blanco", 101, 1, 0, 0, 101),
+    )
+    FORMATO = "<BB" + "H" * len(CAMPOS) + "H"
+    TAMANO = calcsize(FORMATO)
+
+    def __init__(self, hub: PrimeHub):
+        self.hub = hub
+        self.valores = {}
+        for nombre, defecto, escala, paso, minimo, maximo in self.CAMPOS:
+            self.valores[nombre] = defecto
+
+    def lee(self) -> bool:
+        # Devuelve False (y se queda con lo que tenía) si no hay calibración buena
+        datos = self.hub.system.storage(self.DIRECCION, read=self.TAMANO)
+        campos = unpack_from(self.FORMATO, datos)
+        if (campos[0] != self.VERSION or campos[1] != len(self.CAMPOS)
+                or campos[-1] != sum(datos[:-2]) & 0xFFFF):
+            return False
+        for i in range(len(self.CAMPOS)):
+            nombre, defecto, escala, paso, minimo, maximo = self.CAMPOS[i]
+            self.valores[nombre] = campos[2 + i] / escala if escala > 1 else campos[2 + i]
+        return True
+
+    def guarda(self):
+        datos = bytearray(self.TAMANO)
+        enteros = []
+        for nombre, defecto, escala, paso, minimo, maximo in self.CAMPOS:
+            entero = round(self.valores[nombre] * escala)
+            enteros.append(max(round(minimo * escala), min(round(maximo * escala), entero)))
+        pack_into(self.FORMATO, datos, 0, self.VERSION, len(self.CAMPOS), *enteros, 0)
+        pack_into("<H", datos, self.TAMANO - 2, sum(datos[:-2]) & 0xFFFF)
+        self.hub.system.storage(self.DIRECCION, write=bytes(datos))
@@ -0,0 +1,87 @@
+"""
+Opción del menú que mide lo que cuestan las llamadas de los bucles de las
+salidas y cada cuánto da vuelta de verdad cada bucle.
+"""
+from pybricks.parameters import Color
+from pybricks.tools import wait, StopWatch
+
+from montaje import (hub, robot, sensor_color, detector_linea, utillaje_der,
+                     vigilante_der)
+
+
+def estadisticas(muestras):
+    # Mínimo, media y percentil 99
+    ordenadas = sorted(muestras)
+    p99 = ordenadas[min(len(ordenadas) - 1, len(ordenadas) * 99 // 100)]
+    return ordenadas[0], sum(ordenadas) / len(ordenadas), p99
+
+
+def mide_llamada(llamada, *, lotes: int = 50, por_lote: int = 100):
+    # Coste de una llamada en µs. El StopWatch solo da milisegundos, así que
+    # se cronometran lotes de llamadas y se divide (resolución 1000/por_lote µs)
+    reloj = StopWatch()
+    muestras = []
+    for _ in range(lotes):
+        inicio = reloj.time()
+        for _ in range(por_lote):
+            llamada()
+        muestras.append((reloj.time() - inicio) * 1000 / por_lote)
+    return muestras
+
+
+def mide_bucle(paso, *, veces: int = 2000):
+    # Periodo real (ms) de cada vuelta de un bucle "paso(); wait(1)" como los
+    # de las salidas. Se guarda en un bytearray para no reservar en el bucle
+    reloj = StopWatch()
+    periodos = bytearray(veces)
+    anterior = reloj.time()
+    for i in range(veces):
+        paso()
+        wait(1)
+        ahora = reloj.time()
+        periodos[i] = min(ahora - anterior, 255)
+        anterior = ahora
+    return periodos
+
+
+def banco_pruebas():
+    # Mide lo que cuestan las llamadas que usan los bucles de las salidas y
+    # cada cuánto da vuelta de verdad cada bucle. El robot tiene que estar quieto
+    hub.speaker.beep(500)
+    hub.light.on(Color.YELLOW)
+    while hub.buttons.pressed():
+        wait(1)
+
+    llamadas = (
+        ("nada", lambda: None),
+        ("imu.heading", hub.imu.heading),
+        ("sensor.color", sensor_color.color),
+        ("es_linea", lambda: detector_linea.es_linea()),
+        ("motor.stalled", utillaje_der.stalled),
+        ("motor.done", utillaje_der.done),
+        ("motor.speed", utillaje_der.speed),
+        ("robot.distance", robot.distance),
+        ("buttons.pressed", hub.buttons.pressed),
+        ("vigilante.muestra", vigilante_der.muestra),
+    )
+    bucles = (
+        ("wait(1)", lambda: None),
+        ("giro", hub.imu.heading),
+        ("linea", lambda: (robot.distance(), detector_linea.es_linea(), robot.avanza_tareas())),
+        ("atasco", lambda: (utillaje_der.done(), vigilante_der.muestra(), robot.avanza_tareas())),
+        ("stalled", utillaje_der.stalled),
+        ("botones", hub.buttons.pressed),
+    )
+
+    print("llamada (µs)          min   media     p99")
+    for nombre, llamada in llamadas:
+        print("%-18s %7.1f %7.1f %7.1f" % ((nombre,) + estadisticas(mide_llamada(llamada))))
+    vigilante_der.reinicia()
+
+    print("\nbucle (ms)            min   media     p99     Hz")
+    for nombre, paso in bucles:
+        minimo, media, p99 = estadisticas(mide_bucle(paso))
+        print("%-18s %7d %7.2f %7d %6.0f" % (nombre, minimo, media, p99, 1000 / media))
+    print()
+    hub.speaker.beep(500)
+    wait(300)
@@ -0,0 +1,85 @@
+"""
+Opción de calibrar del menú: valores guardados en el hub y sensor de color.
+"""
+from pybricks.parameters import Button, Color
+from pybricks.tools import wait
+
+from montaje import hub, calibracion, clasificador_color, detector_linea, espera_boton
+
+
+def calibra_color():
+    # Se pone el sensor encima de cada color y se pulsa CENTRO
+    hub.speaker.beep(500)
+    for color, char in ((Color.WHITE, "B"), (Color.BLACK, "N"), (Color.NONE, "A")):
+        hub.display.char(char)
+        while hub.buttons.pressed():
+            wait(1)
+        espera_boton()
+        clasificador_color.calibra(color)
+        hub.speaker.beep(400)
+
+    print("niveles:", [clasificador_color.niveles[color] for color in clasificador_color.colores])
+    if not clasificador_color.distingue_blanco():
+        # Calibración mala: se sigue usando sensor_color.color()
+        print("no se distingue el blanco\n")
+        hub.speaker.beep(200, 500)
+        return
+
+    # A partir de ahora la línea se busca con el clasificador calibrado
+    detector_linea.es_linea = clasificador_color.es_blanco
+    calibracion.valores["umbral_blanco"] = clasificador_color.umbral_blanco
+    print("umbral blanco:", clasificador_color.umbral_blanco, "\n")
+    hub.speaker.beep(500)
+    wait(300)
+
+
+def edita_calibracion():
+    # Para cada valor sale su número y luego cuántos pasos se aleja del valor
+    # por defecto (por la consola, el valor). LEFT/RIGHT restan o suman un
+    # paso y CENTRO pasa al siguiente
+    hub.speaker.beep(500)
+    numero = 0
+    for nombre, defecto, escala, paso, minimo, maximo in calibracion.CAMPOS:
+        if paso == 0:
+            continue
+        numero += 1
+        hub.display.char(str(numero))
+        wait(400)
+        entero = round(calibracion.valores[nombre] * escala)
+        base = round(defecto * escala)
+        minimo = round(minimo * escala)
+        maximo = round(maximo * escala)
+        while True:
+            hub.display.number(max(-99, min(99, (entero - base) // paso)))
+            print(nombre + ":", entero / escala if escala > 1 else entero)
+            while hub.buttons.pressed():
+                wait(1)
+            while not hub.buttons.pressed():
+                wait(1)
+            pressed_buttons = hub.buttons.pressed()
+            if Button.CENTER in pressed_buttons:
+                break
+            elif Button.LEFT in pressed_buttons:
+                entero = max(minimo, entero - paso)
+            elif Button.RIGHT in pressed_buttons:
+                entero = min(maximo, entero + paso)
+            hub.speaker.beep(440, 30)
+        calibracion.valores[nombre] = entero / escala if escala > 1 else entero
+        hub.speaker.beep(500)
+
+
+def calibra():
+    # Primero los valores y luego, si se quiere (CENTRO), el sensor de color
+    edita_calibracion()
+    hub.display.char("C")
+    while hub.buttons.pressed():
+        wait(1)
+    while not hub.buttons.pressed():
+        wait(1)
+    if Button.CENTER in hub.buttons.pressed():
+        calibra_color()
+    calibracion.guarda()
+    # La drivebase y los settings se crean al empezar el programa
+    print("calibración guardada, se usa entera al reiniciar el programa\n")
+    hub.speaker.beep(500)
+    wait(300)
@@ -0,0 +1,6 @@
+"""
+Sustituto de Pybricks para ejecutar MasterPiece.py en el ordenador.
+
+Solo implementa lo que usa el programa, con modelos cinemáticos sencillos
+y un reloj virtual: wait() no duerme, avanza el reloj y la simulación.
+"""
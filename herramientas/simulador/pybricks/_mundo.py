@@ -0,0 +1,63 @@
+"""
+Estado compartido de la simulación: reloj virtual, dispositivos
+registrados, guion de botones y dibujo de la alfombra.
+"""
+
+
+class FinSimulacion(Exception):
+    """Se lanza cuando el guion de botones se ha terminado."""
+
+
+# Reloj virtual en milisegundos
+ahora = 0
+
+# Dispositivos que se actualizan en cada milisegundo de simulación
+motores = []
+drivebase = None
+
+# Guion de botones: lista de (botones, duración en ms) o de (botones,
+# duración, función) si hay que hacer algo al pulsar (colocar el robot...)
+guion_botones = []
+pausa_entre_pulsaciones = 300
+fin_tras_inactividad = 5000
+
+# Tramos ocupados (ms sin consultar los botones): (inicio, fin, botones)
+tramos = []
+
+# Líneas de la alfombra: cada cuánto hay una línea blanca y su ancho (mm)
+separacion_lineas = 400
+ancho_linea = 25
+# Recorrido acumulado del robot (mm), lo que ve el sensor de color
+recorrido = 0.0
+# Dónde está el robot en la alfombra (mm), desde donde se encendió
+x = 0.0
+y = 0.0
+
+# Puntos de control: si es un diccionario, al guardar el programa por qué
+# hito va (bytes 1 y 2 del almacenamiento) se apunta aquí cómo estaba el
+# mundo, para luego poder colocar el robot en ese punto
+puntos = None
+
+
+def avanza(ms):
+    """Avanza el reloj virtual ms milisegundos, de uno en uno."""
+    global ahora
+    for _ in range(int(ms)):
+        ahora += 1
+        for motor in motores:
+            motor._paso(0.001)
+        if drivebase is not None:
+            drivebase._paso(0.001)
+
+
+def reinicia():
+    """Deja el mundo como al encender el hub."""
+    global ahora, drivebase, recorrido, x, y
+    ahora = 0
+    del motores[:]
+    drivebase = None
+    del guion_botones[:]
+    del tramos[:]
+    recorrido = 0.0
+    x = 0.0
+    y = 0.0
@@ -0,0 +1,188 @@
+from pybricks import _mundo
+from pybricks.parameters import Axis
+
+
+class _Pantalla:
+    def __init__(self):
+        self.pixeles = [[0] * 5 for _ in range(5)]
+        self.texto = ""
+
+    def orientation(self, up):
+        pass
+
+    def off(self):
+        self.pixeles = [[0] * 5 for _ in range(5)]
+        self.texto = ""
+
+    def pixel(self, row, column, brightness=100):
+        self.pixeles[row][column] = brightness
+
+    def icon(self, icon):
+        for fila in range(5):
+            for columna in range(5):
+                self.pixeles[fila][columna] = icon[fila, columna]
+
+    def char(self, char):
+        self.texto = char
+
+    def number(self, number):
+        self.texto = str(number)
+
+    def text(self, text, on=500, off=50):
+        self.texto = text
+        _mundo.avanza((on + off) * len(text))
+
+    def animate(self, matrices, interval):
+        pass
+
+
+class _Luz:
+    def __init__(self):
+        self.color = None
+
+    def on(self, color):
+        self.color = color
+
+    def off(self):
+        self.color = None
+
+    def blink(self, color, durations):
+        self.color = color
+
+    def animate(self, colors, interval):
+        self.color = colors[0] if colors else None
+
+
+class _Altavoz:
+    def volume(self, volume=None):
+        pass
+
+    def beep(self, frequency=500, duration=100):
+        if duration > 0:
+            _mundo.avanza(duration)
+
+    def play_notes(self, notes, tempo=120):
+        _mundo.avanza(len(notes) * 60000 // tempo // 4)
+
+
+class _Imu:
+    def __init__(self):
+        self._offset = 0.0
+
+    def _heading(self):
+        if _mundo.drivebase is None:
+            return 0.0
+        return _mundo.drivebase._heading_fisico()
+
+    def ready(self):
+        return True
+
+    def stationary(self):
+        return _mundo.drivebase is None or abs(_mundo.drivebase._giro_fisico()) < 1
+
+    def heading(self):
+        return self._heading() - self._offset
+
+    def reset_heading(self, angle):
+        self._offset = self._heading() - angle
+
+    def angular_velocity(self, axis=None):
+        giro = 0.0 if _mundo.drivebase is None else _mundo.drivebase._giro_fisico()
+        # Z hacia arriba: positivo en sentido antihorario
+        if axis is Axis.Z:
+            return -giro
+        if axis is None:
+            return (0.0, 0.0, -giro)
+        return 0.0
+
+    def acceleration(self, axis=None):
+        if axis is None:
+            return (0.0, 0.0, 9810.0)
+        return 9810.0 if axis is Axis.Z else 0.0
+
+    def tilt(self):
+        return (0, 0)
+
+    def up(self):
+        return None
+
+
+class _Botones:
+    def __init__(self):
+        self._activos = None
+        self._fin = 0
+        self._ultima_consulta = 0
+        self._ultimos = ()
+        # Cuándo volvió el programa a mirar los botones tras un tramo largo
+        self._vuelta = 0
+
+    def pressed(self):
+        ahora = _mundo.ahora
+        if ahora - self._ultima_consulta > 1000:
+            _mundo.tramos.append((self._ultima_consulta, ahora, self._ultimos))
+            self._vuelta = ahora
+        self._ultima_consulta = ahora
+
+        if self._activos is not None:
+            if ahora < self._fin:
+                return set(self._activos)
+            self._activos = None
+        if _mundo.guion_botones:
+            # Quien pulsa espera a ver el menú otra vez, no solo a soltar
+            if ahora - max(self._fin, self._vuelta) >= _mundo.pausa_entre_pulsaciones:
+                entrada = _mundo.guion_botones.pop(0)
+                botones, duracion = entrada[:2]
+                if len(entrada) > 2:
+                    entrada[2]()
+                self._activos = botones
+                self._ultimos = botones
+                self._fin = ahora + duracion
+                return set(botones)
+        elif ahora - self._fin > _mundo.fin_tras_inactividad:
+            raise _mundo.FinSimulacion()
+        return set()
+
+
+class _Bateria:
+    def voltage(self):
+        return 8100
+
+    def current(self):
+        return 150
+
+
+class _Sistema:
+    def __init__(self):
+        # Cada hub (y cada vuelta con -n) empieza con el almacenamiento vacío
+        self.almacenamiento = bytearray(512)
+
+    def set_stop_button(self, button):
+        pass
+
+    def name(self):
+        return "simulador"
+
+    def storage(self, offset, write=None, read=None):
+        if write is not None:
+            if _mundo.puntos is not None and offset == 1 and 0 < write[1] < 255:
+                _mundo.puntos[write[1]] = _mundo.drivebase._estado()
+            self.almacenamiento[offset:offset + len(write)] = write
+            return None
+        return bytes(self.almacenamiento[offset:offset + read])
+
+    def shutdown(self):
+        raise _mundo.FinSimulacion()
+
+    def reset_reason(self):
+        return 0
+
+
+class PrimeHub:
+    def __init__(self, top_side=None, front_side=None):
+        self.display = _Pantalla()
+        self.light = _Luz()
+        self.speaker = _Altavoz()
+        self.imu = _Imu()
+        self.buttons = _Botones()
+        self.battery = _Bateria()
+        self.system = _Sistema()
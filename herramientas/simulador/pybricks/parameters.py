@@ -0,0 +1,82 @@
+class _Constante:
+    def __init__(self, nombre):
+        self.nombre = nombre
+
+    def __repr__(self):
+        return self.nombre
+
+
+def _enumera(clase, nombres):
+    for nombre in nombres:
+        setattr(clase, nombre, _Constante(clase.__name__ + "." + nombre))
+    return clase
+
+
+class Button:
+    pass
+
+
+class Direction:
+    pass
+
+
+class Port:
+    pass
+
+
+class Side:
+    pass
+
+
+class Stop:
+    pass
+
+
+class Axis:
+    pass
+
+
+class Icon:
+    pass
+
+
+_enumera(Button, ["LEFT", "RIGHT", "CENTER", "BLUETOOTH", "UP", "DOWN",
+                  "LEFT_UP", "LEFT_DOWN", "RIGHT_UP", "RIGHT_DOWN", "BEACON"])
+_enumera(Direction, ["CLOCKWISE", "COUNTERCLOCKWISE"])
+_enumera(Port, ["A", "B", "C", "D", "E", "F"])
+_enumera(Side, ["TOP", "BOTTOM", "LEFT", "RIGHT", "FRONT", "BACK"])
+_enumera(Stop, ["COAST", "COAST_SMART", "BRAKE", "HOLD", "NONE"])
+_enumera(Axis, ["X", "Y", "Z"])
+_enumera(Icon, ["UP", "DOWN", "LEFT", "RIGHT", "HEART", "HAPPY", "SAD",
+                "TRUE", "FALSE", "EMPTY", "FULL", "PAUSE", "CIRCLE"])
+
+
+class Color:
+    def __init__(self, h, s=100, v=100):
+        self.h = h
+        self.s = s
+        self.v = v
+
+    def __eq__(self, otro):
+        return (isinstance(otro, Color)
+                and (self.h, self.s, self.v) == (otro.h, otro.s, otro.v))
+
+    def __hash__(self):
+        return hash((self.h, self.s, self.v))
+
+    def __repr__(self):
+        return "Color(h=%d, s=%d, v=%d)" % (self.h, self.s, self.v)
+
+
+Color.RED = Color(0)
+Color.ORANGE = Color(30)
+Color.YELLOW = Color(60)
+Color.GREEN = Color(120)
+Color.CYAN = Color(180)
+Color.BLUE = Color(240)
+Color.VIOLET = Color(270)
+Color.MAGENTA = Color(300)
+Color.WHITE = Color(0, 0, 100)
+Color.GRAY = Color(0, 0, 50)
+Color.BLACK = Color(0, 0, 10)
+Color.NONE = Color(0, 0, 0)
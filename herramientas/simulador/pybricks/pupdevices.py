@@ -0,0 +1,296 @@
+from math import sqrt
+
+from pybricks import _mundo
+from pybricks.parameters import Color, Stop
+from pybricks.tools import wait
+
+# Topes mecánicos de cada puerto (grados físicos desde el encendido).
+# Los utillajes necesitan topes para que run_until_stalled() termine.
+topes = {}
+
+_VELOCIDAD_MAXIMA = 1000
+_ACELERACION = 2000
+_MS_HASTA_BLOQUEO = 100
+
+
+class Control:
+    def __init__(self, velocidad=_VELOCIDAD_MAXIMA, aceleracion=_ACELERACION, par=560):
+        self._limites = [velocidad, aceleracion, par]
+        self._pid = [20000, 3000, 2000, 5, 1000]
+        self._tolerancias = [50, 10]
+        self._tolerancias_bloqueo = [20, 200]
+
+    def limits(self, speed=None, acceleration=None, torque=None):
+        if speed is None and acceleration is None and torque is None:
+            return tuple(self._limites)
+        for i, valor in enumerate((speed, acceleration, torque)):
+            if valor is not None:
+                self._limites[i] = valor
+
+    def pid(self, kp=None, ki=None, kd=None, integral_deadzone=None, integral_rate=None):
+        valores = (kp, ki, kd, integral_deadzone, integral_rate)
+        if all(v is None for v in valores):
+            return tuple(self._pid)
+        for i, valor in enumerate(valores):
+            if valor is not None:
+                self._pid[i] = valor
+
+    def target_tolerances(self, speed=None, position=None):
+        if speed is None and position is None:
+            return tuple(self._tolerancias)
+        if speed is not None:
+            self._tolerancias[0] = speed
+        if position is not None:
+            self._tolerancias[1] = position
+
+    def stall_tolerances(self, speed=None, time=None):
+        if speed is None and time is None:
+            return tuple(self._tolerancias_bloqueo)
+        if speed is not None:
+            self._tolerancias_bloqueo[0] = speed
+        if time is not None:
+            self._tolerancias_bloqueo[1] = time
+
+
+class Motor:
+    def __init__(self, port, positive_direction=None, gears=None,
+                 reset_angle=True, profile=None):
+        self.port = port
+        self.control = Control()
+        self._pos = 0.0
+        self._offset = 0.0
+        self._vel = 0.0
+        self._modo = "parado"
+        self._objetivo = 0.0
+        self._v_max = 0.0
+        self._v_obj = 0.0
+        self._acel = _ACELERACION
+        self._then = Stop.HOLD
+        self._terminado = True
+        self._bloqueado_ms = 0
+        self._duty = 100
+        _mundo.motores.append(self)
+
+    # Modelo
+
+    def _paso(self, dt):
+        modo = self._modo
+        deseada = 0.0
+        if modo == "velocidad":
+            deseada = self._v_obj
+        elif modo == "dc":
+            deseada = self._v_obj
+        elif modo == "objetivo":
+            resto = self._objetivo - self._pos
+            sentido = 1 if resto >= 0 else -1
+            if self._then is Stop.NONE:
+                if resto * self._sentido <= 0:
+                    self._modo = "velocidad"
+                    self._v_obj = self._sentido * self._v_max
+                    self._terminado = True
+                    deseada = self._v_obj
+                else:
+                    deseada = self._sentido * self._v_max
+            else:
+                frenada = sqrt(2 * self._acel * abs(resto))
+                deseada = sentido * min(self._v_max, frenada)
+                if abs(resto) < 0.5 and abs(self._vel) < 30:
+                    self._pos = self._objetivo
+                    self._vel = 0.0
+                    self._termina()
+                    return
+        elif modo == "mantiene":
+            deseada = max(-200.0, min(200.0, (self._objetivo - self._pos) * 20))
+            self._vel = deseada
+        elif modo == "parado":
+            deseada = 0.0
+        elif modo == "freno":
+            deseada = 0.0
+
+        if modo != "mantiene":
+            acel = self._acel
+            if modo == "parado":
+                acel = 3000
+            elif modo == "freno":
+                acel = 10000
+            paso = acel * dt
+            if self._vel < deseada:
+                self._vel = min(deseada, self._vel + paso)
+            else:
+                self._vel = max(deseada, self._vel - paso)
+
+        nueva = self._pos + self._vel * dt
+        minimo, maximo = topes.get(self.port, (None, None))
+        empuja = modo in ("velocidad", "objetivo", "dc") and deseada != 0
+        if minimo is not None and nueva < minimo:
+            nueva = minimo
+            self._vel = 0.0
+            self._bloqueado_ms = self._bloqueado_ms + 1 if empuja else 0
+        elif maximo is not None and nueva > maximo:
+            nueva = maximo
+            self._vel = 0.0
+            self._bloqueado_ms = self._bloqueado_ms + 1 if empuja else 0
+        else:
+            self._bloqueado_ms = 0
+        self._pos = nueva
+
+    def _termina(self):
+        self._terminado = True
+        if self._then is Stop.HOLD:
+            self._modo = "mantiene"
+        elif self._then is Stop.BRAKE:
+            self._modo = "freno"
+        else:
+            self._modo = "parado"
+
+    def _mueve_a(self, objetivo_fisico, velocidad, aceleracion, then):
+        self._objetivo = objetivo_fisico
+        self._v_max = abs(velocidad)
+        self._acel = aceleracion
+        self._then = then
+        self._sentido = 1 if objetivo_fisico >= self._pos else -1
+        self._modo = "objetivo"
+        self._terminado = False
+
+    def _gira(self, velocidad, aceleracion=_ACELERACION):
+        self._modo = "velocidad"
+        self._v_obj = velocidad
+        self._acel = aceleracion
+        self._terminado = False
+
+    def _espera(self):
+        while not self.done():
+            wait(1)
+
+    # API de Pybricks
+
+    def angle(self):
+        return int(round(self._pos - self._offset))
+
+    def speed(self):
+        return int(round(self._vel))
+
+    def load(self):
+        if self._bloqueado_ms:
+            return int(self.control.limits()[2] * self._duty / 100 * 0.3)
+        return int(abs(self._vel) * 0.02)
+
+    def stalled(self):
+        return self._bloqueado_ms >= _MS_HASTA_BLOQUEO
+
+    def done(self):
+        return self._terminado
+
+    def _absoluto(self):
+        # Lo que da el encoder absoluto: el ángulo del eje entre -180 y 179
+        return int(round(self._pos + 180)) % 360 - 180
+
+    def reset_angle(self, angle=None):
+        if angle is None:
+            angle = self._absoluto()
+        self._offset = self._pos - angle
+        if self._modo in ("objetivo", "mantiene"):
+            self._modo = "parado"
+            self._terminado = True
+
+    def stop(self):
+        self._modo = "parado"
+        self._terminado = True
+
+    def brake(self):
+        self._modo = "freno"
+        self._terminado = True
+
+    def hold(self):
+        self._objetivo = self._pos
+        self._modo = "mantiene"
+        self._terminado = True
+
+    def run(self, speed):
+        self._gira(speed, self.control.limits()[1])
+
+    def dc(self, duty):
+        self._modo = "dc"
+        self._v_obj = _VELOCIDAD_MAXIMA * duty / 100
+        self._terminado = False
+
+    def run_time(self, speed, time, then=Stop.HOLD, wait=True):
+        self._gira(speed, self.control.limits()[1])
+        fin = _mundo.ahora + time
+        while _mundo.ahora < fin:
+            _mundo.avanza(1)
+        self._then = then
+        self._termina()
+
+    def run_angle(self, speed, rotation_angle, then=Stop.HOLD, wait=True):
+        if speed < 0:
+            rotation_angle = -rotation_angle
+        self._mueve_a(self._pos + rotation_angle, speed,
+                      self.control.limits()[1], then)
+        if wait:
+            self._espera_o_bloqueo()
+
+    def run_target(self, speed, target_angle, then=Stop.HOLD, wait=True):
+        self._mueve_a(target_angle + self._offset, speed,
+                      self.control.limits()[1], then)
+        if wait:
+            self._espera_o_bloqueo()
+
+    def run_until_stalled(self, speed, then=Stop.COAST, duty_limit=None):
+        self._duty = 100 if duty_limit is None else duty_limit
+        self._gira(speed, self.control.limits()[1])
+        inicio = _mundo.ahora
+        while not self.stalled():
+            wait(1)
+            if _mundo.ahora - inicio > 20000:
+                raise RuntimeError("%s no llega nunca a un tope" % self.port)
+        self._duty = 100
+        self._then = then
+        self._termina()
+        return self.angle()
+
+    def _espera_o_bloqueo(self):
+        # Un motor real bloqueado termina el comando cuando salta el stall
+        while not self.done():
+            if self.stalled():
+                self._termina()
+                break
+            wait(1)
+
+
+class _Luces:
+    def on(self, brightness=100):
+        pass
+
+    def off(self):
+        pass
+
+
+class ColorSensor:
+    def __init__(self, port):
+        self.port = port
+        self.lights = _Luces()
+        self._colores = (Color.WHITE, Color.GREEN)
+
+    def _en_linea(self):
+        resto = _mundo.recorrido % _mundo.separacion_lineas
+        return resto >= _mundo.separacion_lineas - _mundo.ancho_linea
+
+    def color(self, surface=True):
+        return Color.WHITE if self._en_linea() else Color.GREEN
+
+    def reflection(self):
+        return 92 if self._en_linea() else 31
+
+    def ambient(self):
+        return 8
+
+    def hsv(self, surface=True):
+        if self._en_linea():
+            return Color(0, 2, 96)
+        return Color(120, 60, 40)
+
+    def detectable_colors(self, colors=None):
+        if colors is None:
+            return self._colores
+        self._colores = tuple(colors)
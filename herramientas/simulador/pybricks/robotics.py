@@ -0,0 +1,142 @@
+from math import pi, radians, degrees, cos, sin
+
+from pybricks import _mundo
+from pybricks.parameters import Stop
+from pybricks.pupdevices import Control
+from pybricks.tools import wait
+
+
+class DriveBase:
+    def __init__(self, left_motor, right_motor, wheel_diameter, axle_track):
+        self.izq = left_motor
+        self.der = right_motor
+        self.diametro = wheel_diameter
+        self.eje = axle_track
+        # grados de rueda por mm recorrido
+        self._k = 360 / (pi * wheel_diameter)
+        self._settings = [
+            int(wheel_diameter * 3.5), int(wheel_diameter * 13),
+            int(wheel_diameter * 3), int(wheel_diameter * 13.6)]
+        self._offset_distancia = 0.0
+        self._offset_angulo = 0.0
+        self._gyro = False
+        self._ultima = self._centro_fisico()
+        self.heading_control = Control(800, 3200)
+        self.distance_control = Control(800, 3200)
+        _mundo.drivebase = self
+
+    # Modelo
+
+    def _centro_fisico(self):
+        return (self.izq._pos + self.der._pos) / 2 / self._k
+
+    def _heading_fisico(self):
+        return degrees((self.izq._pos - self.der._pos) / self._k / self.eje)
+
+    def _giro_fisico(self):
+        # grados/s, positivo en sentido horario
+        return degrees((self.izq._vel - self.der._vel) / self._k / self.eje)
+
+    def _paso(self, dt):
+        centro = self._centro_fisico()
+        avance = centro - self._ultima
+        _mundo.recorrido += abs(avance)
+        if avance:
+            rumbo = radians(self._heading_fisico())
+            _mundo.x += avance * cos(rumbo)
+            _mundo.y += avance * sin(rumbo)
+        self._ultima = centro
+
+    def _estado(self):
+        # Lo que hace falta para volver a poner el robot donde está
+        return (self.izq._pos, self.der._pos, _mundo.recorrido, _mundo.x, _mundo.y)
+
+    def _coloca(self, estado):
+        # Como si se cogiera el robot y se dejara donde estaba en _estado()
+        self.izq._pos, self.der._pos, _mundo.recorrido, _mundo.x, _mundo.y = estado
+        self.izq._vel = self.der._vel = 0.0
+        self._ultima = self._centro_fisico()
+
+    def _pose(self):
+        return (_mundo.x, _mundo.y, self._heading_fisico())
+
+    def _recorre(self, mm_izq, mm_der, velocidad, aceleracion, then, espera):
+        mayor = max(abs(mm_izq), abs(mm_der), 1e-6)
+        for motor, mm in ((self.izq, mm_izq), (self.der, mm_der)):
+            escala = abs(mm) / mayor
+            motor._mueve_a(motor._pos + mm * self._k,
+                           max(1.0, velocidad * self._k * escala),
+                           max(1.0, aceleracion * self._k * escala), then)
+        if espera:
+            while not self.done():
+                wait(1)
+
+    # API de Pybricks
+
+    def settings(self, straight_speed=None, straight_acceleration=None,
+                 turn_rate=None, turn_acceleration=None):
+        valores = (straight_speed, straight_acceleration, turn_rate, turn_acceleration)
+        if all(v is None for v in valores):
+            return tuple(self._settings)
+        for i, valor in enumerate(valores):
+            if valor is not None:
+                self._settings[i] = int(valor)
+
+    def use_gyro(self, use_gyro):
+        self._gyro = use_gyro
+
+    def straight(self, distance, then=Stop.HOLD, wait=True):
+        self._recorre(distance, distance, self._settings[0],
+                      self._settings[1], then, wait)
+
+    def turn(self, angle, then=Stop.HOLD, wait=True):
+        arco = radians(angle) * self.eje / 2
+        velocidad = radians(self._settings[2]) * self.eje / 2
+        aceleracion = radians(self._settings[3]) * self.eje / 2
+        self._recorre(arco, -arco, velocidad, aceleracion, then, wait)
+
+    def curve(self, radius, angle, then=Stop.HOLD, wait=True):
+        giro = radians(angle)
+        centro = abs(radius) * abs(giro) * (1 if radius >= 0 else -1)
+        if radius < 0:
+            giro = -giro
+        mm_izq = centro + giro * self.eje / 2
+        mm_der = centro - giro * self.eje / 2
+        self._recorre(mm_izq, mm_der, self._settings[0],
+                      self._settings[1], then, wait)
+
+    def drive(self, speed, turn_rate):
+        giro = radians(turn_rate) * self.eje / 2
+        self.izq._gira((speed + giro) * self._k, self._settings[1] * self._k)
+        self.der._gira((speed - giro) * self._k, self._settings[1] * self._k)
+
+    def stop(self):
+        self.izq.stop()
+        self.der.stop()
+
+    def brake(self):
+        self.izq.brake()
+        self.der.brake()
+
+    def done(self):
+        return self.izq.done() and self.der.done()
+
+    def distance(self):
+        media = (self.izq.angle() + self.der.angle()) / 2 / self._k
+        return int(round(media - self._offset_distancia))
+
+    def angle(self):
+        return self._heading_fisico() - self._offset_angulo
+
+    def reset(self, distance=0, angle=None):
+        media = (self.izq.angle() + self.der.angle()) / 2 / self._k
+        self._offset_distancia = media - distance
+        if angle is not None:
+            self._offset_angulo = self._heading_fisico() - angle
+
+    def state(self):
+        velocidad = (self.izq._vel + self.der._vel) / 2 / self._k
+        return (self.distance(), velocidad, self.angle(), self._giro_fisico())
+
+    def stalled(self):
+        return self.izq.stalled() or self.der.stalled()
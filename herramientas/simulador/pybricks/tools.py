@@ -0,0 +1,44 @@
+from pybricks import _mundo
+
+
+def wait(time):
+    if time > 0:
+        _mundo.avanza(time)
+
+
+class StopWatch:
+    def __init__(self):
+        self._inicio = _mundo.ahora
+        self._pausado = None
+
+    def time(self):
+        if self._pausado is not None:
+            return self._pausado
+        return _mundo.ahora - self._inicio
+
+    def pause(self):
+        if self._pausado is None:
+            self._pausado = _mundo.ahora - self._inicio
+
+    def resume(self):
+        if self._pausado is not None:
+            self._inicio = _mundo.ahora - self._pausado
+            self._pausado = None
+
+    def reset(self):
+        self._inicio = _mundo.ahora
+        if self._pausado is not None:
+            self._pausado = 0
+
+
+class Matrix:
+    def __init__(self, rows):
+        self._filas = [[v for v in fila] for fila in rows]
+        self.shape = (len(self._filas), len(self._filas[0]) if self._filas else 0)
+
+    def __getitem__(self, indice):
+        fila, columna = indice
+        return self._filas[fila][columna]
+
+    def __repr__(self):
+        return "Matrix(%r)" % (self._filas,)
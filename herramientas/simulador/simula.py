@@ -0,0 +1,141 @@
+"""
+Ejecuta MasterPiece.py en el ordenador con el sustituto de Pybricks.
+
+    python herramientas/simulador/simula.py                  # salidas 1, 2 y 3
+    python herramientas/simulador/simula.py -s 2 3 -n 20     # 20 veces las salidas 2 y 3
+    python herramientas/simulador/simula.py --puntos         # empezar en cada hito
+
+Las pulsaciones de botones salen de un guion: se navega por el menú con
+LEFT/RIGHT hasta cada salida y se lanza con CENTER. Al acabar se muestra
+lo que ha durado cada salida en tiempo virtual.
+
+Con --puntos cada salida se hace entera y luego empezando en cada uno de
+sus hitos (LEFT y RIGHT a la vez en el menú), con el robot colocado donde
+estaba al pasar por él. Tiene que acabar en el mismo sitio.
+"""
+import argparse
+import contextlib
+import io
+import os
+import runpy
+import sys
+import time
+
+CARPETA = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(os.path.dirname(CARPETA))
+sys.path.insert(0, CARPETA)
+
+from pybricks import _mundo  # noqa: E402
+from pybricks import pupdevices  # noqa: E402
+from pybricks.parameters import Button, Port  # noqa: E402
+
+# Topes de los utillajes, en grados desde la posición al encender
+pupdevices.topes[Port.E] = (-150, 150)
+pupdevices.topes[Port.F] = (-1500, 1200)
+
+OPCIONES_MENU = 6
+
+
+def guion_para(salidas):
+    """Pulsaciones para lanzar las salidas en orden desde el menú."""
+    guion = []
+    actual = 1
+    for salida in salidas:
+        for _ in range((salida - actual) % OPCIONES_MENU):
+            guion.append(((Button.RIGHT,), 60))
+        guion.append(((Button.CENTER,), 60))
+        actual = salida % 3 + 1 if salida <= 3 else 1
+    return guion
+
+
+def guion_desde(salida, punto, coloca):
+    """Pulsaciones para empezar la salida en un punto de control."""
+    guion = [((Button.RIGHT,), 60)] * (salida - 1)
+    guion.append(((Button.LEFT, Button.RIGHT), 60))
+    guion.extend([((Button.RIGHT,), 60)] * punto)
+    guion.append(((Button.CENTER,), 60, coloca))
+    return guion
+
+
+def ejecuta(programa, salidas, silencio, guion=None):
+    _mundo.reinicia()
+    _mundo.guion_botones.extend(guion_para(salidas) if guion is None else guion)
+    sys.path.insert(0, os.path.dirname(programa))
+    salida = io.StringIO() if silencio else sys.stdout
+    # Los módulos del programa se vuelven a cargar en cada vuelta
+    cargados = set(sys.modules)
+    try:
+        with contextlib.redirect_stdout(salida):
+            runpy.run_path(programa, run_name="__main__")
+    except _mundo.FinSimulacion:
+        pass
+    finally:
+        sys.path.remove(os.path.dirname(programa))
+        for nombre in set(sys.modules) - cargados:
+            del sys.modules[nombre]
+    # Los tramos largos sin mirar los botones son las salidas
+    return [(fin - inicio) for inicio, fin, botones in _mundo.tramos
+            if Button.CENTER in botones]
+
+
+def verifica_puntos(programa, salidas, silencio, tolerancia=(10, 2)):
+    """Compara dónde acaba cada salida empezando en cada hito."""
+    bien = True
+    for salida in salidas:
+        _mundo.puntos = {}
+        ejecuta(programa, [salida], silencio)
+        puntos, _mundo.puntos = _mundo.puntos, None
+        final = _mundo.drivebase._pose()
+        print("salida %d entera: x=%.0f y=%.0f rumbo=%.0f" % ((salida,) + final))
+        for punto in sorted(puntos):
+            estado = puntos[punto]
+            ejecuta(programa, [], silencio,
+                    guion_desde(salida, punto, lambda: _mundo.drivebase._coloca(estado)))
+            pose = _mundo.drivebase._pose()
+            distancia = ((pose[0] - final[0]) ** 2 + (pose[1] - final[1]) ** 2) ** 0.5
+            giro = abs(pose[2] - final[2])
+            correcto = distancia <= tolerancia[0] and giro <= tolerancia[1]
+            bien = bien and correcto
+            print("    desde el hito %d: x=%.0f y=%.0f rumbo=%.0f (%.0f mm, %.1f grados) %s" % (
+                (punto,) + pose + (distancia, giro, "bien" if correcto else "MAL")))
+    return bien
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-s", "--salidas", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("-n", "--veces", type=int, default=1)
+    parser.add_argument("-p", "--programa", default=os.path.join(RAIZ, "MasterPiece.py"))
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="muestra lo que imprime el programa")
+    parser.add_argument("--puntos", action="store_true",
+                        help="empieza cada salida en cada hito y compara dónde acaba")
+    args = parser.parse_args()
+
+    if args.puntos:
+        salidas = [salida for salida in args.salidas if salida <= 3]
+        sys.exit(0 if verifica_puntos(args.programa, salidas, not args.verbose) else 1)
+
+    inicio = time.perf_counter()
+    tiempos = []
+    for _ in range(args.veces):
+        tiempos.append(ejecuta(args.programa, args.salidas,
+                               silencio=not args.verbose or args.veces > 1))
+    real = time.perf_counter() - inicio
+
+    virtual = 0
+    for i, salida in enumerate(args.salidas):
+        medidas = [t[i] for t in tiempos if i < len(t)]
+        if not medidas:
+            print("salida %d: no ha terminado" % salida)
+            continue
+        virtual += sum(medidas)
+        print("salida %d: %.2f s (min %.2f, max %.2f)" % (
+            salida, sum(medidas) / len(medidas) / 1000,
+            min(medidas) / 1000, max(medidas) / 1000))
+    print("%.1f s virtuales en %.1f s reales (x%.0f)" % (
+        virtual / 1000, real, virtual / 1000 / real if real else 0))
+
+
+if __name__ == "__main__":
+    main()
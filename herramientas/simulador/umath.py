@@ -0,0 +1,2 @@
+"""umath de MicroPython: en el ordenador es math."""
+from math import *  # noqa: F401,F403
@@ -0,0 +1,2 @@
+"""ustruct de MicroPython: en el ordenador es struct."""
+from struct import *  # noqa: F401,F403
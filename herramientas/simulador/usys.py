@@ -0,0 +1,2 @@
+"""usys de MicroPython: en el ordenador es sys."""
+from sys import *  # noqa: F401,F403
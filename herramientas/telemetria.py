@@ -0,0 +1,118 @@
+"""
+Decodifica la telemetría que vuelca MasterPiece.py por la consola.
+
+Se copia la salida de la consola de Pybricks a un fichero y:
+
+    python herramientas/telemetria.py consola.txt              # CSV por pantalla
+    python herramientas/telemetria.py consola.txt -o salida    # salida_1.csv, salida_2.csv...
+    python herramientas/telemetria.py consola.txt --grafica    # necesita matplotlib
+
+Cada bloque va entre "TELEMETRIA <versión> <formato> <registros> <periodo>"
+y "FIN TELEMETRIA", con los registros en hexadecimal.
+"""
+import argparse
+import csv
+import struct
+import sys
+
+# Campos de cada versión del formato, en el orden en que se empaquetan
+CAMPOS = {
+    1: ("tiempo_ms", "rumbo", "distancia", "rueda_izq", "rueda_der",
+        "utillaje_izq", "utillaje_der"),
+}
+# Los campos guardados en décimas
+DECIMAS = ("rumbo",)
+
+
+def lee_bloques(lineas):
+    """Devuelve una lista con las filas (diccionarios) de cada bloque."""
+    bloques = []
+    cabecera = None
+    hexadecimal = []
+    for linea in lineas:
+        linea = linea.strip()
+        if linea.startswith("TELEMETRIA"):
+            cabecera = linea.split()
+            hexadecimal = []
+        elif linea == "FIN TELEMETRIA" and cabecera is not None:
+            bloques.append(decodifica(cabecera, "".join(hexadecimal)))
+            cabecera = None
+        elif cabecera is not None:
+            hexadecimal.append(linea)
+    return bloques
+
+
+def decodifica(cabecera, hexadecimal):
+    version, formato, total = int(cabecera[1]), cabecera[2], int(cabecera[3])
+    if version not in CAMPOS:
+        raise ValueError("versión de telemetría desconocida: %d" % version)
+    datos = bytes.fromhex(hexadecimal)
+    tamano = struct.calcsize(formato)
+    if len(datos) != total * tamano:
+        print("aviso: se esperaban %d registros y hay %d" % (total, len(datos) // tamano),
+              file=sys.stderr)
+    filas = []
+    for valores in struct.iter_unpack(formato, datos[:len(datos) // tamano * tamano]):
+        fila = dict(zip(CAMPOS[version], valores))
+        for campo in DECIMAS:
+            fila[campo] /= 10
+        filas.append(fila)
+    return filas
+
+
+def escribe_csv(filas, fichero):
+    escritor = csv.DictWriter(fichero, fieldnames=list(filas[0]))
+    escritor.writeheader()
+    escritor.writerows(filas)
+
+
+def grafica(bloques):
+    import matplotlib.pyplot as plt
+
+    for n, filas in enumerate(bloques, 1):
+        tiempo = [fila["tiempo_ms"] / 1000 for fila in filas]
+        figura, ejes = plt.subplots(3, 1, sharex=True)
+        figura.suptitle("telemetría %d" % n)
+        ejes[0].plot(tiempo, [fila["rumbo"] for fila in filas])
+        ejes[0].set_ylabel("rumbo (grados)")
+        ejes[1].plot(tiempo, [fila["distancia"] for fila in filas])
+        ejes[1].set_ylabel("distancia (mm)")
+        for campo in ("rueda_izq", "rueda_der", "utillaje_izq", "utillaje_der"):
+            ejes[2].plot(tiempo, [fila[campo] for fila in filas], label=campo)
+        ejes[2].set_ylabel("grados")
+        ejes[2].set_xlabel("tiempo (s)")
+        ejes[2].legend()
+    plt.show()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("consola", nargs="?", help="fichero con la consola (por defecto, stdin)")
+    parser.add_argument("-o", "--prefijo", help="escribe un CSV por bloque: <prefijo>_<n>.csv")
+    parser.add_argument("--grafica", action="store_true", help="dibuja cada bloque")
+    args = parser.parse_args()
+
+    if args.consola:
+        with open(args.consola, encoding="utf-8", errors="replace") as fichero:
+            bloques = lee_bloques(fichero)
+    else:
+        bloques = lee_bloques(sys.stdin)
+    bloques = [filas for filas in bloques if filas]
+    if not bloques:
+        sys.exit("no hay telemetría en la consola")
+
+    if args.grafica:
+        grafica(bloques)
+    elif args.prefijo:
+        for n, filas in enumerate(bloques, 1):
+            nombre = "%s_%d.csv" % (args.prefijo, n)
+            with open(nombre, "w", newline="") as fichero:
+                escribe_csv(filas, fichero)
+            print("%s: %d registros" % (nombre, len(filas)))
+    else:
+        for filas in bloques:
+            escribe_csv(filas, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
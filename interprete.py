@@ -0,0 +1,266 @@
+"""
+Intérprete de las salidas escritas como tablas de pasos, reloj del partido
+y prearmado de los utillajes desde el menú.
+"""
+from pybricks.parameters import Color, Stop
+from pybricks.tools import StopWatch
+
+from mi_drivebase import MiDriveBase
+
+# Colores de cada teatro, en el orden en que se guardan
+colores_teatro = (Color.BLUE, Color.MAGENTA, Color.ORANGE)
+
+# Argumentos de los tramos que enlazan con el siguiente sin parar
+sin_parar = {"stop": Stop.NONE}
+
+
+class Prearmado:
+    """
+    Referencia los utillajes de la salida elegida en el menú mientras se
+    coloca el robot en la base, para que al pulsar CENTRO se mueva ya
+    """
+    def __init__(self, robot: MiDriveBase, referencias: dict):
+        self.robot = robot
+        # Salida -> función que devuelve los generadores de referencia
+        self.referencias = referencias
+        self.salida = None
+        self.tareas = ()
+
+    def prepara(self, salida: int):
+        # Se llama cada vez que se elige una salida en el menú
+        if salida == self.salida:
+            return
+        self.cancela()
+        self.salida = salida
+        if salida in self.referencias:
+            self.tareas = tuple(self.robot.lanza(generador, fondo=True)
+                                for generador in self.referencias[salida]())
+
+    def cancela(self):
+        for tarea in self.tareas:
+            tarea.cancela()
+        self.salida = None
+        self.tareas = ()
+
+    def termina(self, salida: int):
+        # Al empezar la salida: espera a lo que falte, o lo hace entero si no
+        # se había empezado. La siguiente vez hay que volver a referenciar
+        self.prepara(salida)
+        self.robot.une(*self.tareas)
+        self.salida = None
+        self.tareas = ()
+
+
+class RelojPartido:
+    """
+    Cuenta los 2:30 del partido desde que empieza la primera salida y dice
+    cuánto tiempo sobra después de reservar lo que necesitan la salida en
+    curso y las que faltan (sin sus bloques opcionales) y los cambios en la
+    base entre una y otra
+    """
+    DURACION = 150000
+
+    def __init__(self, duraciones: dict, *, cambio: int = 10000):
+        # Salida -> ms que tarda sin los bloques opcionales
+        self.duraciones = duraciones
+        # ms para recoger el robot y colocarlo para la siguiente salida
+        self.cambio = cambio
+        self.cronometro = StopWatch()
+        self.cronometro.pause()
+        self.cronometro.reset()
+        self.empezado = False
+
+    def empieza(self):
+        self.cronometro.reset()
+        self.cronometro.resume()
+        self.empezado = True
+
+    def para(self):
+        # Hasta la siguiente salida no hay partido
+        self.cronometro.pause()
+        self.cronometro.reset()
+        self.empezado = False
+
+    def en_marcha(self) -> bool:
+        return self.empezado and self.cronometro.time() < self.DURACION
+
+    def tiempo(self) -> int:
+        return self.cronometro.time()
+
+    def restante(self) -> int:
+        return max(0, self.DURACION - self.cronometro.time())
+
+    def sobrante(self, salida: int, hecho: int = 0) -> int:
+        # hecho: ms de la parte obligatoria de la salida en curso que ya se han hecho
+        reserva = max(0, self.duraciones.get(salida, 0) - hecho)
+        for otra in self.duraciones:
+            if otra > salida:
+                reserva += self.cambio + self.duraciones[otra]
+        return self.restante() - reserva
+
+
+class Interprete:
+    """
+    Hace las salidas escritas como tablas de pasos: tuplas con la operación
+    y sus argumentos, y al final un diccionario si hay argumentos con nombre.
+    La operación es el nombre de una de las registradas o una función.
+    Antes de cada recto con Stop.NONE mira el paso siguiente, y si es otro
+    recto igual que sigue en el mismo sentido se salta el primero (el robot
+    pasa por ese punto de todas formas).
+    Los hitos de la tabla son también puntos de control: una salida se puede
+    empezar después de cualquiera de ellos, y en el hub se guarda por cuál
+    va para poder repetir solo lo que falta si algo sale mal. Como los giro
+    y recto son absolutos, cada hito lleva el rumbo y los ángulos de las
+    ruedas que tiene el robot al pasar por él ({"rumbo": ..., "ruedas":
+    (izq, der)}, 0 si no se dice, como justo después de un reset) y al
+    empezar ahí se ponen esos. Con "utillajes": ((motor, grados), ...) además
+    se mueven los utillajes lo que se habían movido desde el prearmado.
+    Los bloques opcionales llevan los puntos que dan y lo que tardan. Con el
+    reloj del partido en marcha, al empezar la salida se eligen los que caben
+    en el tiempo que sobra, primero los que más puntos dan por segundo, y
+    antes de hacer cada uno se vuelve a mirar por si se va con retraso
+    """
+    # En hub.system.storage(): número de salida y hitos hechos
+    DIRECCION_PROGRESO = 1
+    # Hitos hechos cuando la salida ha terminado
+    TERMINADA = 255
+    # Operaciones que se hacen aunque se empiece en un punto de control
+    SIEMPRE = ("prearma",)
+    # Operaciones con pasos dentro
+    BLOQUES = ("teatro", "opcional")
+
+    def __init__(self, robot: MiDriveBase, operaciones: dict):
+        self.robot = robot
+        self.operaciones = operaciones
+        self.operaciones["teatro"] = self.teatro
+        self.operaciones["opcional"] = self.opcional
+        # Rectos que se han unido al siguiente
+        self.enlazados = 0
+        # Salida en curso, hitos pasados y desde cuál se empezó
+        self.salida = 0
+        self.hitos = 0
+        self.desde = 0
+        # Reloj del partido (None: se hacen todos los bloques opcionales)
+        self.reloj = None
+        # Bloques opcionales elegidos: nombre -> (puntos por segundo, ms)
+        self.elegidos = None
+        # Cuándo empezó la salida y ms que se han ido en bloques opcionales
+        self.inicio = 0
+        self.en_opcionales = 0
+
+    def hace_salida(self, salida: int, pasos, desde: int = 0):
+        # Hace la tabla entera o, con desde, a partir de ese punto de control
+        self.salida = salida
+        self.hitos = 0
+        self.desde = desde
+        self._guarda_progreso(desde)
+        self._planifica(pasos)
+        self.ejecuta(pasos)
+        self._guarda_progreso(self.TERMINADA)
+
+    def ultimo_punto(self, salida: int) -> int:
+        # Punto de control por el que se quedó la salida la última vez (0 si
+        # terminó o si la última en hacerse fue otra)
+        progreso = self.robot.hub.system.storage(self.DIRECCION_PROGRESO, read=2)
+        if progreso[0] != salida or progreso[1] == self.TERMINADA:
+            return 0
+        return progreso[1]
+
+    def cuenta_hitos(self, pasos) -> int:
+        total = 0
+        for paso in pasos:
+            if paso[0] == "hito":
+                total += 1
+            elif paso[0] in self.BLOQUES:
+                total += self.cuenta_hitos(paso[-1])
+        return total
+
+    def _planifica(self, pasos):
+        self.elegidos = None
+        if self.reloj is None or not self.reloj.en_marcha():
+            return
+        self.inicio = self.reloj.tiempo()
+        self.en_opcionales = 0
+        sobra = self.reloj.sobrante(self.salida)
+        opcionales = sorted((paso for paso in pasos if paso[0] == "opcional"),
+                            key=lambda paso: paso[2] / paso[3], reverse=True)
+        self.elegidos = {}
+        for _, nombre, puntos, ms, _ in opcionales:
+            if ms <= sobra:
+                self.elegidos[nombre] = (puntos / ms, ms)
+                sobra -= ms
+            else:
+                print("sin tiempo para", nombre)
+
+    def _guarda_progreso(self, hitos: int):
+        self.robot.hub.system.storage(self.DIRECCION_PROGRESO, write=bytes((self.salida, hitos)))
+
+    def ejecuta(self, pasos):
+        for i in range(len(pasos)):
+            paso = pasos[i]
+            if paso[0] == "hito":
+                self.hitos += 1
+                if self.hitos < self.desde:
+                    continue
+                if self.hitos == self.desde:
+                    # Se empieza aquí
+                    marco = paso[-1] if isinstance(paso[-1], dict) else {}
+                    self.robot.fija_marco(marco.get("rumbo", 0), marco.get("ruedas", (0, 0)))
+                    for motor, grados in marco.get("utillajes", ()):
+                        motor.run_angle(200, grados)
+                    continue
+                self._guarda_progreso(self.hitos)
+                self.operaciones["hito"](paso[1])
+                continue
+            elif self.hitos < self.desde and paso[0] not in self.SIEMPRE and paso[0] not in self.BLOQUES:
+                # Antes del punto de control solo se hace lo imprescindible
+                continue
+            if paso[0] == "recto" and i + 1 < len(pasos) and self._enlaza(paso, pasos[i + 1]):
+                self.enlazados += 1
+                continue
+            operacion = paso[0]
+            if isinstance(operacion, str):
+                operacion = self.operaciones[operacion]
+            if isinstance(paso[-1], dict):
+                operacion(*paso[1:-1], **paso[-1])
+            else:
+                operacion(*paso[1:])
+
+    def _enlaza(self, paso, siguiente) -> bool:
+        if siguiente[0] != "recto" or not isinstance(paso[-1], dict):
+            return False
+        nombres = paso[-1]
+        if nombres.get("stop") != Stop.NONE:
+            return False
+        nombres_siguiente = siguiente[-1] if isinstance(siguiente[-1], dict) else {}
+        for nombre in ("velocidad", "perfil", "espera"):
+            if nombres.get(nombre) != nombres_siguiente.get(nombre):
+                return False
+        return (paso[1] - self.robot.distance()) * (siguiente[1] - paso[1]) > 0
+
+    def teatro(self, colores: tuple, pasos):
+        # Los pasos solo se hacen si el teatro elegido en el menú es de esos colores
+        numero = int.from_bytes(self.robot.hub.system.storage(0, read=1), "big")
+        if colores_teatro[numero] in colores:
+            self.ejecuta(pasos)
+
+    def opcional(self, nombre: str, puntos: int, ms: int, pasos):
+        # Sin reloj se hace siempre
+        if self.elegidos is None:
+            self.ejecuta(pasos)
+            return
+        if nombre not in self.elegidos:
+            return
+        densidad = self.elegidos.pop(nombre)[0]
+        ahora = self.reloj.tiempo()
+        hecho = ahora - self.inicio - self.en_opcionales
+        # Lo que falta de los elegidos que dan más puntos por segundo va antes
+        pendiente = 0
+        for otra, otros_ms in self.elegidos.values():
+            if otra > densidad:
+                pendiente += otros_ms
+        if self.reloj.sobrante(self.salida, hecho) - pendiente < ms:
+            print("con retraso, se salta", nombre)
+            return
+        self.ejecuta(pasos)
+        self.en_opcionales += self.reloj.tiempo() - ahora
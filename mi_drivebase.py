@@ -0,0 +1,856 @@
+"""
+MiDriveBase y lo que usa para moverse: tareas cooperativas, odometría,
+planificador de arcos, perfilador y telemetría.
+"""
+from pybricks.hubs import PrimeHub
+from pybricks.pupdevices import Motor
+from pybricks.parameters import Stop, Axis
+from pybricks.robotics import DriveBase
+from pybricks.tools import wait, StopWatch
+from umath import sin, cos, tan, atan2, sqrt, pi
+from ustruct import pack_into
+
+
+def perfilado(nombre: str):
+    # Decorador: si el robot tiene un perfilador, mide la llamada. Solo se
+    # apunta la de fuera (no las que hace por dentro) para no contar dos veces
+    def decorador(metodo):
+        def envoltorio(self, *args, **kwargs):
+            perfilador = getattr(self, "robot", self).perfilador
+            if perfilador is None:
+                return metodo(self, *args, **kwargs)
+            perfilador.profundidad += 1
+            inicio = perfilador.reloj.time()
+            try:
+                return metodo(self, *args, **kwargs)
+            finally:
+                perfilador.profundidad -= 1
+                if perfilador.profundidad == 0:
+                    perfilador.anota(nombre, perfilador.reloj.time() - inicio)
+        return envoltorio
+    return decorador
+
+
+class Perfilador:
+    """
+    Mide lo que tarda cada llamada al robot (movimientos, esperas, búsqueda
+    de línea...) y lo agrupa por los hitos de la salida. Al final imprime
+    una tabla de lo que más cuesta a lo que menos; "otros" es el tiempo del
+    tramo que no está en ninguna llamada medida (motores de los utillajes...)
+    """
+    def __init__(self):
+        self.reloj = StopWatch()
+        self.profundidad = 0
+        # (hito, llamada) -> [ms, veces]
+        self.costes = {}
+        # llamada -> [ms, veces] del tramo en curso
+        self.tramo = {}
+        self.inicio_tramo = 0
+        # (hito, ms) en orden
+        self.hitos = []
+
+    def anota(self, nombre: str, ms: int):
+        coste = self.tramo.get(nombre)
+        if coste is None:
+            self.tramo[nombre] = [ms, 1]
+        else:
+            coste[0] += ms
+            coste[1] += 1
+
+    def hito(self, hito: str):
+        # Todo lo medido desde el hito anterior cuenta para este
+        ahora = self.reloj.time()
+        total = ahora - self.inicio_tramo
+        medido = 0
+        for coste in self.tramo.values():
+            medido += coste[0]
+        # Después de sumar: los dict de MicroPython no guardan el orden
+        self.tramo["otros"] = [total - medido, 0]
+        for nombre, coste in self.tramo.items():
+            # Si el hito se repite se suma a lo que ya tenía
+            anterior = self.costes.get((hito, nombre))
+            if anterior is None:
+                self.costes[(hito, nombre)] = coste
+            else:
+                anterior[0] += coste[0]
+                anterior[1] += coste[1]
+        self.hitos.append((hito, total))
+        self.tramo = {}
+        self.inicio_tramo = ahora
+
+    def imprime(self):
+        print("hitos:")
+        for hito, ms in self.hitos:
+            print("    %-30s %6d ms" % (hito, ms))
+        print("coste por hito y llamada:")
+        for clave, coste in sorted(self.costes.items(), key=lambda e: -e[1][0]):
+            if coste[0] == 0 and coste[1] == 0:
+                continue
+            print("    %-30s %-14s %6d ms %4d" % (clave[0], clave[1], coste[0], coste[1]))
+        print()
+
+
+class Tarea:
+    """
+    Tarea cooperativa: un generador que avanza un paso cada vez
+    que el robot está esperando (a que acabe un movimiento, en espera()...)
+    Las de fondo (como la telemetría) no cuentan para une()
+    No se usa multitask()/run_task() (que sí están en la 3.3) porque con
+    ellos todo lo que espera tiene que ser async y el programa entero correr
+    dentro de run_task(): las salidas, el menú y los submenús de calibrar
+    se quedan como están, con sus llamadas normales, y cualquier bucle de
+    espera puede hacer avanzar las tareas con avanza_tareas()
+    """
+    def __init__(self, generador, fondo: bool = False):
+        self.generador = generador
+        self.fondo = fondo
+        self.hecha = False
+
+    def paso(self):
+        if self.hecha:
+            return
+        try:
+            next(self.generador)
+        except StopIteration:
+            self.hecha = True
+
+    def cancela(self):
+        # Corta el generador (se ejecutan sus finally) y la da por hecha
+        if not self.hecha:
+            self.generador.close()
+            self.hecha = True
+
+
+def mueve_utillaje(motor: Motor, velocidad: int, angulo: int, *,
+                   stop: Stop = Stop.HOLD, retraso_ms: int = 0):
+    # Generador para robot.lanza(): mueve el utillaje sin bloquear el robot.
+    # Con retraso_ms se puede empezar a mitad de un movimiento
+    if retraso_ms > 0:
+        reloj = StopWatch()
+        while reloj.time() < retraso_ms:
+            yield
+    motor.run_angle(velocidad, angulo, then=stop, wait=False)
+    while not motor.done():
+        yield
+
+
+def referencia_utillaje(motor: Motor, velocidad: int, *, duty_limit: int = None,
+                        stop: Stop = Stop.COAST, vuelta: int = 0,
+                        velocidad_vuelta: int = 200, espera_vuelta: bool = True,
+                        reinicia: bool = True, cero: int = 0):
+    # Generador para robot.lanza(): lo mismo que run_until_stalled() con su
+    # duty_limit, luego run_angle(velocidad_vuelta, vuelta) y reset_angle(cero)
+    # (cero = None es el ángulo absoluto), pero sin bloquear
+    limites = motor.control.limits()
+    motor.stop()
+    if duty_limit is not None:
+        motor.control.limits(torque=limites[2] * duty_limit // 100)
+    try:
+        motor.run(velocidad)
+        yield
+        while not motor.stalled():
+            yield
+    finally:
+        # También si se cancela a medias
+        motor.stop()
+        motor.control.limits(torque=limites[2])
+    if stop == Stop.HOLD:
+        motor.hold()
+    elif stop == Stop.BRAKE:
+        motor.brake()
+
+    if vuelta:
+        motor.run_angle(velocidad_vuelta, vuelta, wait=False)
+        if espera_vuelta:
+            while not motor.done():
+                yield
+    if reinicia:
+        motor.reset_angle(cero)
+
+
+def planifica_arcos(puntos, x: float, y: float, *, radio: float = 150,
+                    velocidad: int = None, aceleracion_lateral: int = 800,
+                    giro_max: float = 150) -> list:
+    # Convierte una lista de puntos (x, y) en tramos que se enlazan sin parar:
+    # rectas y, en cada esquina, una curva tangente a las dos rectas.
+    # Cada tramo es ("recto", mm, velocidad) o ("curva", radio, grados, velocidad),
+    # o ("giro", grados, None) si la esquina es tan cerrada que hay que parar.
+    # Solo se baja la velocidad en las curvas, lo justo para su radio
+    # (v = raíz de aceleración lateral por radio). El robot tiene que estar
+    # en (x, y) mirando ya hacia el primer punto
+    tramos = []
+    anterior = (x, y)
+    recorte_anterior = 0
+    for i in range(len(puntos)):
+        punto = puntos[i]
+        dx = punto[0] - anterior[0]
+        dy = punto[1] - anterior[1]
+        largo = sqrt(dx * dx + dy * dy)
+        recorte = 0
+        curva = None
+        if i + 1 < len(puntos):
+            siguiente = puntos[i + 1]
+            sx = siguiente[0] - punto[0]
+            sy = siguiente[1] - punto[1]
+            cambio = (atan2(sy, sx) - atan2(dy, dx)) * 180 / pi
+            cambio = (cambio + 180) % 360 - 180
+            if abs(cambio) > giro_max:
+                curva = ("giro", cambio, None)
+            elif abs(cambio) >= 1:
+                # La curva empieza y acaba a una distancia "recorte" de la
+                # esquina, y no puede comerse más de media recta
+                mitad = tan(abs(cambio) * pi / 360)
+                recorte = min(radio * mitad, (largo - recorte_anterior) / 2,
+                              sqrt(sx * sx + sy * sy) / 2)
+                radio_real = recorte / mitad
+                velocidad_curva = int(sqrt(aceleracion_lateral * radio_real))
+                if velocidad is not None:
+                    velocidad_curva = min(velocidad, velocidad_curva)
+                curva = ("curva", radio_real, cambio, velocidad_curva)
+
+        recta = largo - recorte_anterior - recorte
+        if recta >= 1:
+            tramos.append(("recto", recta, velocidad))
+        if curva is not None:
+            tramos.append(curva)
+        anterior = punto
+        recorte_anterior = recorte
+    return tramos
+
+
+class Odometria:
+    """
+    Estima dónde está el robot en la mesa: x e y en mm y el rumbo en grados.
+    La distancia sale de los encoders de las ruedas y el rumbo del giroscopio.
+    Con rumbo 0 la x va hacia delante y la y hacia la derecha; el rumbo es
+    positivo en sentido horario, igual que hub.imu.heading()
+    """
+    def __init__(self, drivebase: DriveBase, hub: PrimeHub):
+        self.drivebase = drivebase
+        self.hub = hub
+        self.x = 0
+        self.y = 0
+        self.rumbo = 0
+        # rumbo = hub.imu.heading() + desfase, para que reset_heading() no lo mueva
+        self.desfase = 0
+        self.distancia = drivebase.distance()
+
+    def actualiza(self):
+        distancia = self.drivebase.distance()
+        rumbo = self.hub.imu.heading() + self.desfase
+        avance = distancia - self.distancia
+        if avance:
+            # Se avanza con el rumbo medio del tramo
+            medio = (rumbo + self.rumbo) * pi / 360
+            self.x += avance * cos(medio)
+            self.y += avance * sin(medio)
+        self.distancia = distancia
+        self.rumbo = rumbo
+
+    def reinicia_distancia(self):
+        # Después de poner a cero la distancia de la drivebase
+        self.distancia = self.drivebase.distance()
+
+    def reinicia_rumbo(self):
+        # Después de poner a cero el rumbo del giroscopio
+        self.desfase = self.rumbo - self.hub.imu.heading()
+
+    def ancla(self, x: float = None, y: float = None, rumbo: float = None):
+        # Para cuando el robot está en un sitio conocido (una pared, una línea)
+        self.actualiza()
+        if x is not None:
+            self.x = x
+        if y is not None:
+            self.y = y
+        if rumbo is not None:
+            self.desfase = rumbo - self.hub.imu.heading()
+            self.rumbo = rumbo
+
+
+def _todas_hechas(tareas) -> bool:
+    # Como all() con un generador, pero sin reservar memoria en cada vuelta
+    for tarea in tareas:
+        if not tarea.hecha:
+            return False
+    return True
+
+
+class MiDriveBase:
+    """
+    Clase con nuestra propia DriveBase para
+    mover el robot con los parámetros que queramos
+    """
+    # Nombres de los parámetros de drivebase.settings(), en su orden
+    NOMBRES_SETTINGS = ("straight_speed", "straight_acceleration",
+                        "turn_rate", "turn_acceleration")
+
+    def __init__(self, drivebase: DriveBase, hub: PrimeHub, rueda_izq: Motor, rueda_der: Motor):
+        self.drivebase = drivebase
+        self.settings_predeterminados = self.drivebase.settings()
+        # Perfiles de movimiento: nombre -> (settings, pid distancia, pid rumbo)
+        self.perfiles = {"predeterminado": (self.settings_predeterminados,
+                                            drivebase.distance_control.pid(),
+                                            drivebase.heading_control.pid())}
+        # Lo que tiene puesto la drivebase ahora, para no mandar lo que no cambia
+        self._aplicado = self.perfiles["predeterminado"]
+        self.hub = hub
+        self.rueda_izq = rueda_izq
+        self.rueda_der = rueda_der
+        # Tareas lanzadas con lanza() que siguen en marcha
+        self.tareas = []
+        self.pose = Odometria(drivebase, hub)
+        # Tarea de recto_angulo(sincronizado=True, espera=False) en marcha
+        self._sincronia = None
+        # Perfilador de la salida en curso (None = no se mide)
+        self.perfilador = None
+
+        # Asentado adaptativo: en vez de esperar siempre wait_ms después de
+        # un movimiento, se sigue en cuanto el robot está quieto (wait_ms
+        # pasa a ser el máximo). Umbrales en grados/s de rueda y de rumbo
+        self.asentado_adaptativo = False
+        self.asentado_velocidad = 20
+        self.asentado_giro = 3
+        # ms ahorrados en la última llamada y en total, y si se imprimen
+        self.ultimo_ahorro = 0
+        self.ahorro_total = 0
+        self.informa_asentado = False
+
+        # Vigilancia de la memoria en las esperas: función que da los bytes
+        # ocupados, como gc.mem_alloc (None = no se mira). Si entre dos
+        # vueltas hay menos memoria ocupada es que ha pasado el recolector
+        self.mide_memoria = None
+        self.memoria_ocupada = 0
+        self.memoria_reservada = 0
+        self.recolecciones = 0
+
+    def registra_perfil(self, nombre: str, *, velocidad: int = None,
+                        aceleracion: int = None, velocidad_giro: int = None,
+                        aceleracion_giro: int = None, pid_distancia: tuple = None,
+                        pid_rumbo: tuple = None):
+        # Lo que no se da se queda como en el perfil predeterminado. Los pid
+        # son tuplas como las que devuelve Control.pid(): (kp, ki, kd, ...)
+        settings, distancia, rumbo = self.perfiles["predeterminado"]
+        settings = list(settings)
+        for i, valor in enumerate((velocidad, aceleracion, velocidad_giro, aceleracion_giro)):
+            if valor is not None:
+                settings[i] = valor
+        self.perfiles[nombre] = (tuple(settings),
+                                 distancia if pid_distancia is None else pid_distancia,
+                                 rumbo if pid_rumbo is None else pid_rumbo)
+
+    def aplica(self, perfil: str = None, *, velocidad: int = None,
+               velocidad_giro: int = None):
+        # Deja la drivebase con el perfil (None = predeterminado) y, si se
+        # dan, estas velocidades. Solo se manda lo que ha cambiado, así una
+        # serie de movimientos con el mismo perfil no cuesta nada
+        settings, distancia, rumbo = self.perfiles["predeterminado" if perfil is None else perfil]
+        if velocidad is not None or velocidad_giro is not None:
+            settings = list(settings)
+            if velocidad is not None:
+                settings[0] = velocidad
+            if velocidad_giro is not None:
+                settings[2] = velocidad_giro
+            settings = tuple(settings)
+        aplicado = self._aplicado
+
+        if settings != aplicado[0]:
+            cambios = {}
+            for i in range(4):
+                if settings[i] != aplicado[0][i]:
+                    cambios[self.NOMBRES_SETTINGS[i]] = settings[i]
+            self.drivebase.settings(**cambios)
+        if not self.drivebase.done():
+            # Los pid solo se cambian con la drivebase parada: enlazando con
+            # Stop.NONE se siguen usando los de antes
+            self._aplicado = (settings,) + aplicado[1:]
+            return
+        if (distancia, rumbo) == aplicado[1:]:
+            self._aplicado = (settings,) + aplicado[1:]
+            return
+        # done() también es cierto mientras la drivebase aguanta la posición
+        # tras Stop.HOLD, y entonces el control sigue activo. Se para del todo
+        # antes de cambiar nada; como aplica() siempre va justo antes de un
+        # movimiento, el robot deja de aguantar solo un instante
+        self.drivebase.stop()
+        if distancia != aplicado[1]:
+            self.drivebase.distance_control.pid(*distancia)
+        if rumbo != aplicado[2]:
+            self.drivebase.heading_control.pid(*rumbo)
+        self._aplicado = (settings, distancia, rumbo)
+
+    def hito(self, nombre: str):
+        # Marca el final de una parte de la salida ("pollo hecho"...)
+        if self.perfilador is not None:
+            self.perfilador.hito(nombre)
+
+    def lanza(self, generador, *, fondo: bool = False) -> Tarea:
+        tarea = Tarea(generador, fondo)
+        # El primer paso se da ya, para que el motor arranque en este momento
+        tarea.paso()
+        if not tarea.hecha:
+            self.tareas.append(tarea)
+        return tarea
+
+    def avanza_tareas(self):
+        # Se llama en cada vuelta de todas las esperas, así que también
+        # mantiene al día la odometría
+        if self.mide_memoria is not None:
+            self._vigila_memoria()
+        self.pose.actualiza()
+        hechas = False
+        for tarea in self.tareas:
+            tarea.paso()
+            hechas = hechas or tarea.hecha
+        if hechas:
+            self.tareas = [tarea for tarea in self.tareas if not tarea.hecha]
+
+    def _vigila_memoria(self):
+        ocupada = self.mide_memoria()
+        if ocupada < self.memoria_ocupada:
+            self.recolecciones += 1
+        else:
+            self.memoria_reservada += ocupada - self.memoria_ocupada
+        self.memoria_ocupada = ocupada
+
+    def empieza_memoria(self, mide_memoria):
+        # Pone a cero la cuenta; se llama justo después de gc.collect()
+        self.mide_memoria = mide_memoria
+        self.memoria_ocupada = mide_memoria()
+        self.memoria_reservada = 0
+        self.recolecciones = 0
+
+    @perfilado("une")
+    def une(self, *tareas: Tarea):
+        # Espera a que terminen las tareas (si no se dice cuáles, todas
+        # menos las de fondo)
+        if not tareas:
+            tareas = tuple(tarea for tarea in self.tareas if not tarea.fondo)
+        while not _todas_hechas(tareas):
+            self.avanza_tareas()
+            wait(1)
+
+    @perfilado("espera")
+    def espera(self, ms: int):
+        # Como wait(), pero las tareas lanzadas siguen avanzando
+        if not self.tareas:
+            wait(ms)
+            return
+        reloj = StopWatch()
+        while reloj.time() < ms:
+            self.avanza_tareas()
+            wait(1)
+
+    def _asienta(self, wait_ms: int, stop: Stop, *, ruedas: bool = False):
+        # Con Stop.NONE el robot sigue en marcha y lo siguiente (un coast(),
+        # por ejemplo) cuenta con esa espera, así que no se acorta
+        if not self.asentado_adaptativo or stop == Stop.NONE or wait_ms <= 0:
+            self.espera(wait_ms)
+            return
+
+        reloj = StopWatch()
+        while reloj.time() < wait_ms:
+            if ruedas:
+                hecho = self.rueda_izq.done() and self.rueda_der.done()
+            else:
+                hecho = self.drivebase.done()
+            if (hecho
+                    and abs(self.rueda_izq.speed()) < self.asentado_velocidad
+                    and abs(self.rueda_der.speed()) < self.asentado_velocidad
+                    and abs(self.hub.imu.angular_velocity(Axis.Z)) < self.asentado_giro):
+                break
+            self.avanza_tareas()
+            wait(1)
+
+        self.ultimo_ahorro = wait_ms - reloj.time()
+        self.ahorro_total += self.ultimo_ahorro
+        if self.informa_asentado:
+            print("asentado:", reloj.time(), "ms, ahorro:", self.ultimo_ahorro, "ms")
+
+    def _espera_drivebase(self):
+        while not self.drivebase.done():
+            self.avanza_tareas()
+            wait(1)
+
+    @perfilado("recto")
+    def recto(self, distancia: int, *, velocidad: int = None,
+              stop: Stop = Stop.HOLD, wait_ms: int = 50,
+              espera: bool = True, perfil: str = None):
+        self.pose.actualiza()
+        self._para_sincronia()
+        # Si se especifica una velocidad, se usa esta velocidad, si no, la del perfil
+        self.aplica(perfil, velocidad=velocidad)
+
+        distancia_actual = self.drivebase.distance()
+
+        # Con tareas en marcha no se bloquea: se espera dándoles paso
+        if espera and self.tareas:
+            self.drivebase.straight(distancia - distancia_actual, then=stop, wait=False)
+            self._espera_drivebase()
+        else:
+            self.drivebase.straight(distancia - distancia_actual, then=stop, wait=espera)
+
+        if wait_ms > 0 or stop != Stop.NONE or espera:
+            self._asienta(wait_ms, stop)
+        self.pose.actualiza()
+
+    @perfilado("recto_angulo")
+    def recto_angulo(self, grados: int, *, velocidad: int = 700,
+              stop: Stop = Stop.HOLD, wait_ms: int = 100,
+              espera: bool = True, sincronizado: bool = False):
+        # Con sincronizado, las dos ruedas siguen un objetivo común y se
+        # corrigen la una a la otra, para que los empujones rápidos no tuerzan
+        self.pose.actualiza()
+        self._para_sincronia()
+        grados_iniciales = self.rueda_izq.angle()
+        if sincronizado:
+            movimiento = self._sincroniza(grados - grados_iniciales, velocidad, stop)
+            if espera:
+                for _ in movimiento:
+                    self.avanza_tareas()
+                    wait(1)
+            else:
+                self._sincronia = self.lanza(movimiento)
+        else:
+            self.rueda_izq.run_angle(velocidad, grados - grados_iniciales, then=stop, wait=False)
+            self.rueda_der.run_angle(velocidad, grados - grados_iniciales, then=stop, wait=False)
+            if espera:
+                while not (self.rueda_izq.done() and self.rueda_der.done()):
+                    self.avanza_tareas()
+                    wait(1)
+        if wait_ms > 0 or stop != Stop.NONE or espera:
+            self._asienta(wait_ms, stop, ruedas=True)
+        self.pose.actualiza()
+
+    def _sincroniza(self, grados: int, velocidad: int, stop: Stop, *,
+                    ganancia: float = 4, frenada: float = 60,
+                    velocidad_min: int = 40, tolerancia: int = 2):
+        # Generador: las dos ruedas avanzan grados con la velocidad que toque
+        # según lo que falta (frenando con la raíz, menos con Stop.NONE), y
+        # a cada una se le resta o suma la diferencia con la otra
+        signo = 1 if grados >= 0 else -1
+        inicio_izq = self.rueda_izq.angle()
+        inicio_der = self.rueda_der.angle()
+        while True:
+            avance_izq = self.rueda_izq.angle() - inicio_izq
+            avance_der = self.rueda_der.angle() - inicio_der
+            falta = signo * grados - signo * (avance_izq + avance_der) / 2
+            if falta <= tolerancia:
+                break
+            v = velocidad
+            if stop != Stop.NONE:
+                v = min(velocidad, max(velocidad_min, frenada * falta ** 0.5))
+            correccion = ganancia * (avance_izq - avance_der)
+            self.rueda_izq.run(signo * v - correccion)
+            self.rueda_der.run(signo * v + correccion)
+            yield
+
+        if stop == Stop.HOLD:
+            self.rueda_izq.hold()
+            self.rueda_der.hold()
+        elif stop == Stop.BRAKE:
+            self.rueda_izq.brake()
+            self.rueda_der.brake()
+        elif stop != Stop.NONE:
+            self.rueda_izq.stop()
+            self.rueda_der.stop()
+
+    def drive(self, velocidad: int = None, *, giro: int = 0, sentido: int = 1):
+        self.pose.actualiza()
+        self._para_sincronia()
+        if velocidad == None:
+            velocidad = self.settings_predeterminados[0]
+        # drive() usa las aceleraciones de los settings
+        self.aplica()
+        self.drivebase.drive(velocidad * sentido, giro)
+
+    @perfilado("giro")
+    def giro(self, angulo_objetivo: int, *, velocidad: int = None,
+                 stop: Stop = Stop.HOLD, wait_ms: int = 100,
+                 espera: bool = True, perfil: str = None):
+        self.pose.actualiza()
+        self._para_sincronia()
+        angulo_inicial = self.hub.imu.heading()
+
+        # Si se especifica una velocidad, se usa esta velocidad, si no, la del perfil
+        self.aplica(perfil, velocidad_giro=velocidad or None)
+
+        if espera and self.tareas:
+            self.drivebase.turn(angulo_objetivo - angulo_inicial, then=stop, wait=False)
+            self._espera_drivebase()
+        else:
+            self.drivebase.turn(angulo_objetivo - angulo_inicial, then=stop, wait=espera)
+        if wait_ms > 0 or stop != Stop.NONE or espera:
+            self._asienta(wait_ms, stop)
+        self.pose.actualiza()
+
+    @perfilado("pivota")
+    def pivota(self, angulo_objetivo: int, *, rueda: Motor = None,
+               velocidad: int = 300, velocidad_min: int = 40,
+               ganancia: float = 60, tolerancia: float = 1,
+               tiempo_max: int = 3000):
+        # Gira sobre una rueda, con la otra quieta, hasta que el rumbo es
+        # angulo_objetivo. La velocidad baja con la raíz del error (frenada
+        # constante) y para en cuanto está dentro de la tolerancia, así que
+        # no hace falta esperar después
+        self._para_sincronia()
+        error = angulo_objetivo - self.hub.imu.heading()
+        if rueda is None:
+            # Si no se dice, gira la rueda que va hacia delante
+            rueda = self.rueda_izq if error > 0 else self.rueda_der
+        otra = self.rueda_der if rueda is self.rueda_izq else self.rueda_izq
+        # La rueda izquierda hacia delante aumenta el rumbo, la derecha lo disminuye
+        signo = 1 if rueda is self.rueda_izq else -1
+
+        otra.hold()
+        reloj = StopWatch()
+        while abs(error) > tolerancia and reloj.time() < tiempo_max:
+            v = min(velocidad, max(velocidad_min, ganancia * abs(error) ** 0.5))
+            rueda.run(signo * v if error > 0 else -signo * v)
+            self.avanza_tareas()
+            wait(1)
+            error = angulo_objetivo - self.hub.imu.heading()
+        self.brake()
+
+    @perfilado("cuadrar_pared")
+    def cuadrar_pared(self, *, velocidad: int = 400, sentido: int = -1,
+                      tiempo_min: int = 150, tiempo_max: int = 1000,
+                      velocidad_contacto: int = 40, giro_max: int = 5,
+                      estable_ms: int = 30, frena: bool = True,
+                      ancla: tuple = None) -> int:
+        # Empuja contra la pared con cada rueda por su cuenta (para que el
+        # robot se ponga recto) y para en cuanto las dos ruedas están
+        # apretadas y el rumbo ya no cambia, o al llegar a tiempo_max.
+        # Si frena, además pone a cero el rumbo y la distancia, y si se da
+        # ancla = (x, y, rumbo) se corrige ahí la odometría (None = no se toca).
+        # Devuelve los ms que ha tardado
+        self.recto_angulo(sentido * 10000, velocidad=velocidad,
+                          espera=False, wait_ms=0)
+        reloj = StopWatch()
+        armado = False
+        estable = 0
+        while reloj.time() < tiempo_max:
+            self.avanza_tareas()
+            wait(1)
+            velocidad_izq = abs(self.rueda_izq.speed())
+            velocidad_der = abs(self.rueda_der.speed())
+            if not armado:
+                # No se mira el contacto hasta que el robot ha arrancado
+                armado = ((velocidad_izq > velocidad_contacto and velocidad_der > velocidad_contacto)
+                          or reloj.time() >= tiempo_min)
+                continue
+            if (velocidad_izq < velocidad_contacto and velocidad_der < velocidad_contacto
+                    and abs(self.hub.imu.angular_velocity(Axis.Z)) < giro_max):
+                estable += 1
+                if estable >= estable_ms:
+                    break
+            else:
+                estable = 0
+        tiempo = reloj.time()
+
+        if frena:
+            self.brake()
+            self.reset_giro()
+            self.reset_motores()
+        if ancla is not None:
+            self.pose.ancla(*ancla)
+        return tiempo
+
+    @perfilado("mira")
+    def mira(self, rumbo: float, **kwargs):
+        # Gira hasta el rumbo de la odometría, por el lado más corto
+        self.pose.actualiza()
+        diferencia = (rumbo - self.pose.rumbo + 180) % 360 - 180
+        self.giro(self.hub.imu.heading() + diferencia, **kwargs)
+
+    @perfilado("ir_a")
+    def ir_a(self, x: float, y: float, rumbo: float = None, *,
+             velocidad: int = None, atras: bool = False,
+             stop: Stop = Stop.HOLD, perfil: str = None):
+        # Va en línea recta al punto (x, y) de la odometría, marcha atrás si
+        # atras, y si se da rumbo se gira después hasta él
+        self.pose.actualiza()
+        dx = x - self.pose.x
+        dy = y - self.pose.y
+        distancia = sqrt(dx * dx + dy * dy)
+        if distancia >= 1:
+            direccion = atan2(dy, dx) * 180 / pi
+            if atras:
+                direccion += 180
+                distancia = -distancia
+            self.mira(direccion, perfil=perfil)
+            self.recto(self.distance() + distancia, velocidad=velocidad,
+                       stop=Stop.HOLD if rumbo is not None else stop, perfil=perfil)
+        if rumbo is not None:
+            self.mira(rumbo, stop=stop, perfil=perfil)
+
+    @perfilado("recorre")
+    def recorre(self, tramos, *, stop: Stop = Stop.HOLD, wait_ms: int = 50,
+                perfil: str = None):
+        # Hace los tramos de planifica_arcos() uno detrás de otro con
+        # Stop.NONE entre medias, así el robot no para en las esquinas
+        self.pose.actualiza()
+        self._para_sincronia()
+        for i in range(len(tramos)):
+            tramo = tramos[i]
+            final = stop if i == len(tramos) - 1 else Stop.NONE
+            self.aplica(perfil, velocidad=tramo[-1])
+            if tramo[0] == "recto":
+                self.drivebase.straight(tramo[1], then=final, wait=False)
+            elif tramo[0] == "curva":
+                self.drivebase.curve(tramo[1], tramo[2], then=final, wait=False)
+            else:
+                self.drivebase.turn(tramo[1], then=Stop.HOLD, wait=False)
+            self._espera_drivebase()
+        self._asienta(wait_ms, stop)
+        self.pose.actualiza()
+
+    def recorre_puntos(self, puntos, *, radio: float = 150, velocidad: int = None,
+                       stop: Stop = Stop.HOLD, perfil: str = None):
+        # Pasa por los puntos (x, y) de la odometría enlazándolos con curvas
+        if velocidad is None:
+            # Así las curvas tampoco van más rápido que las rectas
+            velocidad = self.perfiles["predeterminado" if perfil is None else perfil][0][0]
+        self.pose.actualiza()
+        primero = puntos[0]
+        self.mira(atan2(primero[1] - self.pose.y, primero[0] - self.pose.x) * 180 / pi,
+                  perfil=perfil)
+        self.recorre(planifica_arcos(puntos, self.pose.x, self.pose.y,
+                                     radio=radio, velocidad=velocidad),
+                     stop=stop, perfil=perfil)
+
+    def curva(self, radio: float, angulo: float, *, then: Stop = Stop.HOLD,
+              wait: bool = True):
+        # drivebase.curve(), pero antes se acaba lo que estuviera moviendo las ruedas
+        self.pose.actualiza()
+        self._para_sincronia()
+        self.drivebase.curve(radio, angulo, then=then, wait=wait)
+
+    def _para_sincronia(self):
+        # Un recto_angulo sincronizado sin espera sigue mandando en las ruedas
+        # hasta que se frena, se suelta o empieza otro movimiento
+        if self._sincronia is not None:
+            self._sincronia.cancela()
+            self._sincronia = None
+
+    def brake(self):
+        self.pose.actualiza()
+        self._para_sincronia()
+        self.drivebase.brake()
+        self.rueda_izq.brake()
+        self.rueda_der.brake()
+
+    def coast(self):
+        self.pose.actualiza()
+        self._para_sincronia()
+        self.drivebase.stop()
+        self.rueda_izq.stop()
+        self.rueda_der.stop()
+
+    def reset_giro(self):
+        self.pose.actualiza()
+        self.hub.imu.reset_heading(0)
+        self.pose.reinicia_rumbo()
+
+    def reset_motores(self):
+        self.pose.actualiza()
+        self.rueda_izq.reset_angle(0)
+        self.rueda_der.reset_angle(0)
+        self.drivebase.reset()
+        self.pose.reinicia_distancia()
+        # (estoy en versión 3.3.0 de Pybricks)
+        # es importante tener el reset de la distancia debajo del reset de los
+        # motores porque el cambio de ángulo de los motores modifica la distancia
+        # https://github.com/pybricks/support/issues/1449
+
+    def fija_marco(self, rumbo: float = 0, ruedas: tuple = (0, 0)):
+        # Para empezar a mitad de una salida: el rumbo y los ángulos de las
+        # ruedas pasan a ser los que tendría el robot en ese punto (giro,
+        # recto y recto_angulo son absolutos desde el último reset). Las
+        # ruedas se cambian después del reset de la drivebase, así la
+        # distancia sale de ellas: justo lo que en reset_motores() se evita
+        self.pose.actualiza()
+        self.hub.imu.reset_heading(rumbo)
+        self.pose.reinicia_rumbo()
+        self.reset_motores()
+        if ruedas != (0, 0):
+            self.rueda_izq.reset_angle(ruedas[0])
+            self.rueda_der.reset_angle(ruedas[1])
+            self.pose.reinicia_distancia()
+
+    def distance(self):
+        return self.drivebase.distance()
+
+    def settings(self):
+        return self.drivebase.settings()
+
+
+class Telemetria:
+    """
+    Graba el estado del robot a ritmo fijo en un buffer circular reservado
+    al principio, así durante la salida no se reserva memoria ni se imprime.
+    Al acabar se vuelca por la consola en hexadecimal; en el ordenador se
+    pasa a CSV o gráfica con herramientas/telemetria.py
+    """
+    VERSION = 1
+    # tiempo (ms), rumbo (décimas de grado), distancia (mm),
+    # rueda_izq, rueda_der, utillaje_izq y utillaje_der (grados)
+    FORMATO = "<Ihiiihh"
+    TAMANO = 22
+
+    def __init__(self, robot: MiDriveBase, utillaje_izq: Motor, utillaje_der: Motor, *,
+                 capacidad: int = 1000, periodo_ms: int = 20):
+        self.robot = robot
+        self.utillaje_izq = utillaje_izq
+        self.utillaje_der = utillaje_der
+        self.buffer = bytearray(capacidad * self.TAMANO)
+        self.capacidad = capacidad
+        self.periodo_ms = periodo_ms
+        self.reloj = StopWatch()
+        self.siguiente = 0
+        self.escritos = 0
+        self.activa = False
+
+    def inicia(self):
+        self.reloj.reset()
+        self.siguiente = 0
+        self.escritos = 0
+        self.activa = True
+        # Como tarea de fondo se graba en todas las esperas del robot
+        self.robot.lanza(self.graba(), fondo=True)
+
+    def para(self):
+        self.activa = False
+
+    def graba(self):
+        while self.activa:
+            tiempo = self.reloj.time()
+            if tiempo >= self.siguiente:
+                self.muestra(tiempo)
+                # Después de una llamada que bloquea no se recupera lo perdido
+                self.siguiente = tiempo + self.periodo_ms
+            yield
+
+    def muestra(self, tiempo: int):
+        rumbo = int(self.robot.hub.imu.heading() * 10)
+        rumbo = max(-32768, min(32767, rumbo))
+        posicion = (self.escritos % self.capacidad) * self.TAMANO
+        pack_into(self.FORMATO, self.buffer, posicion, tiempo, rumbo,
+                  self.robot.distance(), self.robot.rueda_izq.angle(),
+                  self.robot.rueda_der.angle(),
+                  max(-32768, min(32767, self.utillaje_izq.angle())),
+                  max(-32768, min(32767, self.utillaje_der.angle())))
+        self.escritos += 1
+
+    def vuelca(self, por_linea: int = 8):
+        # Cabecera, los registros del más antiguo al más nuevo y el final
+        total = min(self.escritos, self.capacidad)
+        primero = self.escritos - total
+        print("TELEMETRIA", self.VERSION, self.FORMATO, total, self.periodo_ms)
+        for inicio in range(0, total, por_linea):
+            linea = ""
+            for n in range(inicio, min(total, inicio + por_linea)):
+                posicion = ((primero + n) % self.capacidad) * self.TAMANO
+                for i in range(posicion, posicion + self.TAMANO):
+                    linea += "%02x" % self.buffer[i]
+            print(linea)
+        print("FIN TELEMETRIA")
@@ -0,0 +1,142 @@
+"""
+Los dispositivos del robot y los objetos que comparten el menú y las
+salidas. Se importa una vez desde MasterPiece.py.
+"""
+from pybricks.hubs import PrimeHub
+from pybricks.pupdevices import Motor, ColorSensor
+from pybricks.parameters import Button, Direction, Port, Side, Stop, Axis
+from pybricks.robotics import DriveBase
+from pybricks.tools import wait
+
+from mi_drivebase import MiDriveBase, Telemetria, referencia_utillaje
+from sensores import ClasificadorColor, DetectorLinea, VigilanteCarga
+from ajustes import Calibracion, CompensacionBateria
+from interprete import Interprete, Prearmado, RelojPartido
+
+hub = PrimeHub(top_side=Axis.Z, front_side=Axis.Y)
+hub.display.orientation(Side.TOP)
+
+calibracion = Calibracion(hub)
+if not calibracion.lee():
+    print("sin calibración guardada, se usan los valores por defecto")
+
+rueda_izq = Motor(Port.B, Direction.COUNTERCLOCKWISE, reset_angle=True)
+rueda_der = Motor(Port.A, Direction.CLOCKWISE, reset_angle=True)
+
+drivebase = DriveBase(rueda_izq, rueda_der, calibracion.valores["diametro"],
+                      calibracion.valores["eje"])
+drivebase.use_gyro(True)
+drivebase.settings(217*calibracion.valores["factor_recta"],
+                   816*calibracion.valores["factor_aceleracion"],
+                   189*calibracion.valores["factor_giro"],
+                   851*calibracion.valores["factor_aceleracion_giro"])
+# straight_speed, straight_acceleration, turn_speed, turn_acceleration
+
+utillaje_izq = Motor(Port.E, Direction.COUNTERCLOCKWISE, reset_angle=True)
+utillaje_der = Motor(Port.F, Direction.COUNTERCLOCKWISE, reset_angle=True)
+
+sensor_color = ColorSensor(Port.D)
+clasificador_color = ClasificadorColor(sensor_color)
+
+robot = MiDriveBase(drivebase, hub, rueda_izq, rueda_der)
+robot.asentado_adaptativo = True
+# Perfiles de movimiento para usar con perfil="..." en recto, giro, ir_a...
+# (los pid se dejan como vienen hasta afinarlos en la alfombra)
+robot.registra_perfil("empuje", velocidad=200, aceleracion=400)
+robot.registra_perfil("preciso", velocidad=150, aceleracion=400,
+                      velocidad_giro=100, aceleracion_giro=400)
+robot.registra_perfil("rapido", velocidad=450, aceleracion=1200)
+# Se mide la batería antes de cada salida para compensar los empujes de tiempo fijo
+bateria = CompensacionBateria(hub)
+# Si se perfila, al acabar cada salida se imprime lo que ha costado cada parte
+perfila = False
+# Si se vigila la memoria, antes de cada salida se pasa el recolector y al
+# acabar se dice cuánto se ha reservado y si ha vuelto a pasar en las esperas
+vigila_memoria = False
+# Si se graba la telemetría, se vuelca por la consola al acabar cada salida
+graba_telemetria = False
+telemetria = Telemetria(robot, utillaje_izq, utillaje_der) if graba_telemetria else None
+detector_linea = DetectorLinea(sensor_color, robot)
+if calibracion.valores["umbral_blanco"] <= 100:
+    # El sensor ya se calibró en otra ocasión
+    clasificador_color.umbral_blanco = calibracion.valores["umbral_blanco"]
+    detector_linea.es_linea = clasificador_color.es_blanco
+vigilante_izq = VigilanteCarga(utillaje_izq, robot)
+vigilante_der = VigilanteCarga(utillaje_der, robot)
+# Cómo se referencian los utillajes al principio de cada salida
+prearmado = Prearmado(robot, {
+    1: lambda: (referencia_utillaje(utillaje_izq, -200, duty_limit=calibracion.valores["duty_1"],
+                                    stop=Stop.HOLD, vuelta=20, cero=None),),
+    2: lambda: (referencia_utillaje(utillaje_izq, 200, duty_limit=calibracion.valores["duty_2"],
+                                    vuelta=-20, espera_vuelta=False),),
+    3: lambda: (referencia_utillaje(utillaje_der, 200, duty_limit=calibracion.valores["duty_3"],
+                                    stop=Stop.HOLD, reinicia=False),),
+})
+
+
+def espera_boton():
+    while Button.CENTER not in hub.buttons.pressed():
+        wait(1)
+
+def informa():
+    # Cómo ha acabado la salida
+    print("rueda_izq:", rueda_izq.angle())
+    print("rueda_der:", rueda_der.angle())
+    print("distance:", robot.distance())
+    print("heading:", hub.imu.heading())
+    print("pose: x=%d y=%d rumbo=%d" % (robot.pose.x, robot.pose.y, robot.pose.rumbo))
+    print("asentado ahorrado:", robot.ahorro_total, "ms")
+    print()
+
+
+def avisa_atasco(vigilante: VigilanteCarga, *args, **kwargs):
+    # Pita si el utillaje se ha quedado atascado
+    if vigilante.mueve(*args, **kwargs):
+        hub.speaker.beep(440)
+
+
+def cuadra(*, tiempo_max: int = 1000, **kwargs) -> int:
+    # El tope de tiempo del empuje contra la pared, compensado con la batería
+    return robot.cuadrar_pared(tiempo_max=bateria.ms(tiempo_max), **kwargs)
+
+
+def reinicia_robot():
+    robot.reset_giro()
+    robot.reset_motores()
+
+
+interprete = Interprete(robot, {
+    "recto": robot.recto,
+    "recto_angulo": robot.recto_angulo,
+    "giro": robot.giro,
+    "pivota": robot.pivota,
+    "cuadra": cuadra,
+    "drive": robot.drive,
+    "curva": robot.curva,
+    "coast": robot.coast,
+    "brake": robot.brake,
+    "reset": reinicia_robot,
+    "reset_motores": robot.reset_motores,
+    "espera": robot.espera,
+    # Espera de empuje, compensada con la batería
+    "empuja": lambda ms: robot.espera(bateria.ms(ms)),
+    "hito": robot.hito,
+    "lanza": lambda funcion, *args: robot.lanza(funcion(*args)),
+    "une": robot.une,
+    "prearma": prearmado.termina,
+    "linea": detector_linea.espera_bordes,
+    "izq": utillaje_izq.run_angle,
+    "der": utillaje_der.run_angle,
+    "tope_der": utillaje_der.run_until_stalled,
+    "para_der": utillaje_der.stop,
+    "frena_der": utillaje_der.brake,
+    "atasco_der": vigilante_der.mueve,
+    "pita": hub.speaker.beep,
+    # Para ir probando las salidas paso a paso
+    "boton": espera_boton,
+})
+# Reloj del partido: empieza con la salida 1 y, si se va con retraso, se
+# saltan los bloques opcionales que no caben. Lo que tarda cada salida sin
+# sus opcionales y el cambio en la base están medidos en el simulador (hay
+# que afinarlos en la alfombra). Con None se hacen siempre
+interprete.reloj = RelojPartido({1: 26000, 2: 33000, 3: 31000}, cambio=10000)
@@ -0,0 +1,92 @@
+from pybricks.hubs import PrimeHub
+from pybricks.pupdevices import Motor
+from pybricks.parameters import Stop
+from pybricks.robotics import DriveBase
+
+from mi_drivebase import MiDriveBase, mueve_utillaje
+from interprete import sin_parar
+from montaje import interprete, informa, rueda_der, utillaje_izq
+
+
+pasos_salida_1 = (
+    #("recto_angulo", -280),
+    #("espera", 200),
+    #("recto_angulo", 10),
+
+    # para llevar el brazo hasta el tope y que siempre empiece desde el mismo
+    # sitio (normalmente ya se ha hecho en el menú)
+    ("prearma", 1),
+
+    ("recto", -150),
+    ("espera", 200),
+    ("recto", 16),
+    ("hito", "carrito liberado", {"ruedas": (29, 29)}),
+
+    ("giro", 45),
+    ("recto", 400, sin_parar),
+    ("recto_angulo", 12400, {"velocidad": 130, "stop": Stop.COAST_SMART, "espera": False}),
+    ("atasco_der", 1000, -1800),
+    ("para_der",),
+    ("coast",),
+    ("reset",),
+    ("hito", "pollo hecho"),
+
+    ("recto", -40, {"velocidad": 80, "stop": Stop.NONE}),
+    ("recto", -165),
+    ("giro", -98),
+    #("recto_angulo", -1122, sin_parar),
+    #("recto", -586, sin_parar),
+    ("recto", -582, sin_parar),
+    ("coast",),
+    ("espera", 300),
+    ("der", 300, 300, {"wait": False}),
+    ("espera", 500),
+    ("recto", -535),
+    ("hito", "altavoces y luces hechas", {"rumbo": -98, "ruedas": (-1155, -810)}),
+
+    ("giro", -20),
+    ("recto_angulo", -500),
+    ("giro", -42),
+    ("der", 200, -250, {"wait": False}),
+    ("recto", 130, sin_parar),
+    ("recto", 180, {"velocidad": 150, "stop": Stop.NONE}),
+    ("drive", 60),
+    ("linea", (False, True, False), {"distancia_max": 150}),
+    ("brake",),
+    ("reset_motores",),
+    #("espera", 100),
+    #("recto", 31),
+    ("hito", "referenciados con la línea", {"rumbo": -42}),
+    ("espera", 100),
+    # el brazo baja mientras gira
+    ("lanza", mueve_utillaje, utillaje_izq, 200, 140),
+    ("giro", -132),
+    ("une",),
+    ("hito", "brazo bajado", {"rumbo": -132, "ruedas": (-158, 159),
+                              "utillajes": ((utillaje_izq, 140),)}),
+
+    ("recto", -70, sin_parar),
+    ("recto", -100, {"velocidad": 250, "stop": Stop.NONE}),
+    ("cuadra", {"velocidad": 200, "tiempo_max": 600, "frena": False}),
+    ("izq", 200, -140),
+    ("reset",),
+    ("hito", "paredes lilas hechas"),
+
+    #("recto", 170),
+    ("recto", 155),
+    #("boton",),
+    ("giro", 217),
+    #("boton",),
+    ("recto", -335),
+    #("boton",),
+    #(rueda_der.run_angle, 400, -210),
+    ("pivota", 250, {"rueda": rueda_der, "velocidad": 200}),
+    ("recto", -1000, {"velocidad": 600, "stop": Stop.COAST}),
+)
+
+
+def salida_1(hub: PrimeHub, rueda_izq: Motor, rueda_der: Motor,
+             drivebase: DriveBase, robot: MiDriveBase,
+             utillaje_izq: Motor, utillaje_der: Motor, *, desde: int = 0):
+    interprete.hace_salida(1, pasos_salida_1, desde)
+    informa()
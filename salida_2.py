@@ -0,0 +1,92 @@
+from pybricks.hubs import PrimeHub
+from pybricks.pupdevices import Motor
+from pybricks.parameters import Color, Stop
+from pybricks.robotics import DriveBase
+
+from mi_drivebase import MiDriveBase
+from interprete import sin_parar
+from montaje import interprete, informa, avisa_atasco, rueda_izq, rueda_der, vigilante_der
+
+
+pasos_salida_2 = (
+    ("reset",),
+    ("prearma", 2),
+
+    (avisa_atasco, vigilante_der, 900, 1100, sin_parar),
+    ("frena_der",),
+
+    ("recto", -50, {"velocidad": 200, "stop": Stop.NONE}),
+    ("cuadra", {"velocidad": 300, "tiempo_max": 500}),
+
+    ("pivota", 37, {"rueda": rueda_izq, "velocidad": 100}),
+    ("recto", 280, sin_parar),
+    ("recto", 430, {"velocidad": 200, "stop": Stop.NONE}),
+    ("recto", 510, {"velocidad": 70, "stop": Stop.NONE}),
+    ("coast",),
+    ("espera", 300),
+    ("brake",),
+    ("reset",),
+    ("hito", "mezclador hecho"),
+
+    ("recto", -220),
+    ("giro", -40),
+    ("recto", 179),
+    ("pivota", -84, {"rueda": rueda_der, "velocidad": 200}),
+    ("recto", 285),
+    ("izq", 70, -100),
+    ("hito", "experto recogido y teatro hecho", {"rumbo": -83, "ruedas": (378, 670)}),
+
+    # DEPENDIENDO DEL OTRO EQUIPO (y de si queda tiempo):
+    # nombre, puntos, ms que tarda
+    ("opcional", "teatro", 20, 2000, (
+        ("teatro", (Color.BLUE, Color.ORANGE), (
+            ("recto", 220),
+            ("espera", 200),
+            ("recto", 285),
+        )),
+    )),
+
+    ("pivota", -129, {"rueda": rueda_izq, "velocidad": 200}),
+    ("recto", 50),
+    ("der", 900, -950),
+    ("recto", -200, sin_parar),
+    #      _
+    #     / \
+    #    / ! \
+    #   /_____\
+    #
+    ("recto", -390, {"velocidad": 200, "stop": Stop.NONE}),
+    #("der", 900, 780, {"wait": False}),
+    ("pita", {"duration": -1}),
+    ("drive", -60),
+    # aquí se para al entrar en el blanco, no al salir como en la salida 1
+    ("linea", (False, True), {"distancia_max": 300}),
+    ("brake",),
+    ("pita",),
+    ("espera", 100),
+    ("reset_motores",),
+    ("hito", "referenciados con la línea", {"rumbo": -128}),
+    ("recto", -45),
+
+    ("pivota", -45, {"rueda": rueda_izq, "velocidad": 350}),
+    ("recto", 50, sin_parar),
+    ("cuadra", {"velocidad": 400, "tiempo_max": 700}),
+
+    ("tope_der", 1000, {"then": Stop.HOLD}),
+    ("der", 1000, -200),
+
+    ("recto", 25),
+    ("pivota", 95, {"rueda": rueda_izq, "velocidad": 500}),
+    ("recto", 650, sin_parar),
+    ("curva", 300, 46, {"then": Stop.NONE}),
+    ("recto_angulo", 10000, {"velocidad": 800, "espera": False, "sincronizado": True}),
+    ("empuja", 1000),
+    ("coast",),
+)
+
+
+def salida_2(hub: PrimeHub, rueda_izq: Motor, rueda_der: Motor,
+             drivebase: DriveBase, robot: MiDriveBase,
+             utillaje_izq: Motor, utillaje_der: Motor, *, desde: int = 0):
+    interprete.hace_salida(2, pasos_salida_2, desde)
+    informa()
@@ -0,0 +1,56 @@
+from pybricks.hubs import PrimeHub
+from pybricks.pupdevices import Motor
+from pybricks.parameters import Stop
+from pybricks.robotics import DriveBase
+
+from mi_drivebase import MiDriveBase
+from interprete import sin_parar
+from montaje import interprete, informa, rueda_izq, rueda_der
+
+
+pasos_salida_3 = (
+    ("reset",),
+    ("prearma", 3),
+
+    ("recto", -270, sin_parar),
+    ("recto", -450, {"velocidad": 40, "stop": Stop.NONE}),
+    ("recto", -600, sin_parar),
+    ("recto", -650, {"velocidad": 200, "stop": Stop.NONE}),
+    ("recto", -720, {"velocidad": 140, "stop": Stop.NONE}),
+    ("coast",),
+    ("recto", -210),
+    ("giro", -85),
+    ("recto", -250, sin_parar),
+    ("cuadra", {"velocidad": 600, "tiempo_max": 700}),
+    # cuadra (con frena) deja el rumbo y la distancia a 0
+    ("hito", "primera pared"),
+    ("recto", 500),
+    ("pivota", -30, {"rueda": rueda_der, "velocidad": 200}),
+    ("recto", 670),
+    ("pivota", 44, {"rueda": rueda_izq, "velocidad": 200}),
+    ("recto", 900, {"velocidad": 120}),
+    ("izq", 1000, -350),
+    ("recto", 730),
+    ("giro", 90),
+    ("recto", 305),
+    ("giro", 178),
+    ("recto", 250, sin_parar),
+    ("cuadra", {"velocidad": 400, "tiempo_max": 850, "frena": False}),
+    ("der", 200, -220),
+    ("brake",),
+    ("reset",),
+    ("hito", "segunda pared"),
+    ("recto", 164, {"velocidad": 150}),
+    ("giro", -90, {"velocidad": 40}),
+    ("recto", 482),
+    ("giro", -181),
+    ("recto", 545, sin_parar),
+    ("coast",),
+)
+
+
+def salida_3(hub: PrimeHub, rueda_izq: Motor, rueda_der: Motor,
+             drivebase: DriveBase, robot: MiDriveBase,
+             utillaje_izq: Motor, utillaje_der: Motor, *, desde: int = 0):
+    interprete.hace_salida(3, pasos_salida_3, desde)
+    informa()
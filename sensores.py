@@ -0,0 +1,295 @@
+"""
+Lo que mira los sensores mientras el robot se mueve: clasificador del
+sensor de color, detector de líneas y vigilante de atascos de los motores.
+También la cola de eventos de los botones del hub para los menús.
+"""
+from pybricks.hubs import PrimeHub
+from pybricks.pupdevices import Motor, ColorSensor
+from pybricks.parameters import Color, Stop
+from pybricks.tools import wait, StopWatch
+
+from mi_drivebase import MiDriveBase, perfilado
+
+
+class ClasificadorColor:
+    """
+    Clasificador rápido para el sensor de color. Se calibra una vez en la
+    alfombra con reflection() (o con el brillo de hsv()) y guarda una tabla
+    con la clase de cada lectura posible, así cada consulta cuesta un índice
+    (o una comparación para saber si es blanco)
+    """
+    def __init__(self, sensor: ColorSensor, *, modo: str = "reflexion"):
+        self.sensor = sensor
+        if modo == "hsv":
+            self.lectura = lambda: sensor.hsv().v
+        else:
+            self.lectura = sensor.reflection
+        # Lectura media de cada color calibrado
+        self.niveles = {}
+        self.colores = [Color.NONE]
+        # Índice en colores para cada lectura de 0 a 100
+        self.tabla = bytearray(101)
+        # Hasta calibrar nada es blanco
+        self.umbral_blanco = 101
+
+    def calibra(self, color: Color, muestras: int = 50):
+        suma = 0
+        for i in range(muestras):
+            suma += self.lectura()
+            wait(2)
+        self.niveles[color] = suma // muestras
+        self.construye()
+
+    def construye(self):
+        # Ordena los colores de menos a más brillo y cada lectura se queda
+        # con el color calibrado más cercano
+        self.colores = sorted(self.niveles, key=lambda color: self.niveles[color])
+        niveles = [self.niveles[color] for color in self.colores]
+        clase = 0
+        for lectura in range(101):
+            while (clase + 1 < len(niveles)
+                   and lectura - niveles[clase] > niveles[clase + 1] - lectura):
+                clase += 1
+            self.tabla[lectura] = clase
+
+        self.umbral_blanco = 101
+        if Color.WHITE in self.niveles:
+            for lectura in range(101):
+                if self.colores[self.tabla[lectura]] == Color.WHITE:
+                    self.umbral_blanco = lectura
+                    break
+
+    def distingue_blanco(self, margen: int = 10) -> bool:
+        # El blanco tiene que ser lo más brillante y con margen de sobra
+        if len(self.colores) < 2 or self.colores[-1] != Color.WHITE:
+            return False
+        return self.niveles[Color.WHITE] - self.niveles[self.colores[-2]] >= margen
+
+    def color(self) -> Color:
+        return self.colores[self.tabla[self.lectura()]]
+
+    def es_blanco(self) -> bool:
+        return self.lectura() >= self.umbral_blanco
+
+
+class DetectorLinea:
+    """
+    Detecta los bordes de una línea con el sensor de color mientras el robot
+    se mueve. Guarda las últimas muestras en una ventana de tamaño fijo y solo
+    da un cambio por bueno cuando coinciden suficientes muestras (antirrebote)
+    """
+    def __init__(self, sensor: ColorSensor, robot: MiDriveBase, *,
+                 ventana: int = 30, coincidencias: int = None,
+                 periodo_ms: int = 1):
+        self.sensor = sensor
+        self.robot = robot
+        self.ventana = bytearray(ventana)
+        # Por defecto toda la ventana tiene que coincidir
+        self.coincidencias = ventana if coincidencias is None else coincidencias
+        self.periodo_ms = periodo_ms
+        # Función que dice si el sensor está sobre la línea
+        self.es_linea = self._es_blanco
+
+    def _es_blanco(self):
+        return self.sensor.color() == Color.WHITE
+
+    @perfilado("espera_bordes")
+    def espera_bordes(self, secuencia, *, distancia_max: int = None):
+        # Espera a ver en orden los estados de la secuencia (True = sobre la
+        # línea). Devuelve la distancia de la drivebase en la que empezó cada
+        # estado, o None (con el robot frenado) si recorre más de
+        # distancia_max sin verlos
+        ventana = self.ventana
+        tamano = len(ventana)
+        distancia_inicial = self.robot.distance()
+        bordes = []
+        for estado in secuencia:
+            for i in range(tamano):
+                ventana[i] = 0
+            i = 0
+            cuenta = 0
+            inicio = None
+            while cuenta < self.coincidencias:
+                distancia = self.robot.distance()
+                if distancia_max is not None and abs(distancia - distancia_inicial) > distancia_max:
+                    self.robot.brake()
+                    return None
+
+                muestra = 1 if self.es_linea() == estado else 0
+                if not muestra:
+                    inicio = None
+                elif inicio is None:
+                    # primera muestra de la racha buena: si es la que llena la
+                    # ventana, aquí está el borde
+                    inicio = distancia
+                cuenta += muestra - ventana[i]
+                ventana[i] = muestra
+                i += 1
+                if i == tamano:
+                    i = 0
+
+                self.robot.avanza_tareas()
+                wait(self.periodo_ms)
+            bordes.append(inicio)
+        return bordes
+
+
+class VigilanteCarga:
+    """
+    Vigila la velocidad (y si se quiere la carga) de un motor en una ventana
+    de tiempo deslizante, para acabar un movimiento en cuanto el mecanismo
+    llega al tope en vez de esperar a que salte stalled()
+    """
+    def __init__(self, motor: Motor, robot: MiDriveBase, *,
+                 ventana: int = 40, velocidad_min: int = 30,
+                 carga_min: int = None, tiempo_min: int = 200,
+                 tolerancia: int = 10):
+        self.motor = motor
+        self.robot = robot
+        self.ventana = bytearray(ventana)
+        self.velocidad_min = velocidad_min
+        # Si se da, además de ir lento tiene que estar haciendo fuerza (mNm)
+        self.carga_min = carga_min
+        # Si el motor no llega a velocidad_min, se empieza a contar a los tiempo_min ms
+        self.tiempo_min = tiempo_min
+        # Grados antes del objetivo en los que ir lento es frenar, no atascarse
+        self.tolerancia = tolerancia
+        self.reloj = StopWatch()
+        self.armado = False
+        self.i = 0
+        self.cuenta = 0
+        # Si el último movimiento acabó por atasco
+        self.atasco = False
+
+    def reinicia(self):
+        for i in range(len(self.ventana)):
+            self.ventana[i] = 0
+        self.i = 0
+        self.cuenta = 0
+        self.armado = False
+        self.reloj.reset()
+
+    def muestra(self) -> bool:
+        # Añade una muestra y dice si toda la ventana está bloqueada
+        velocidad = abs(self.motor.speed())
+        if not self.armado:
+            # Con carga el motor tarda en arrancar: no se cuenta hasta que
+            # se mueve de verdad (o ha pasado tiempo_min sin moverse)
+            self.armado = velocidad >= self.velocidad_min or self.reloj.time() >= self.tiempo_min
+            return False
+        bloqueado = velocidad < self.velocidad_min
+        if bloqueado and self.carga_min is not None:
+            bloqueado = abs(self.motor.load()) >= self.carga_min
+        muestra = 1 if bloqueado else 0
+        self.cuenta += muestra - self.ventana[self.i]
+        self.ventana[self.i] = muestra
+        self.i += 1
+        if self.i == len(self.ventana):
+            self.i = 0
+        return self.cuenta == len(self.ventana)
+
+    def vigila(self, velocidad: int, angulo: int, *, stop: Stop = Stop.HOLD):
+        # Generador para robot.lanza(): run_angle que acaba al atascarse
+        self.atasco = False
+        self.reinicia()
+        objetivo = self.motor.angle() + (angulo if velocidad >= 0 else -angulo)
+        self.motor.run_angle(velocidad, angulo, then=stop, wait=False)
+        while not self.motor.done():
+            if self.muestra():
+                # Parado ya junto al objetivo es que ha llegado (está frenando)
+                self.atasco = abs(objetivo - self.motor.angle()) > self.tolerancia
+                if stop == Stop.HOLD:
+                    self.motor.hold()
+                elif stop == Stop.COAST or stop == Stop.COAST_SMART:
+                    self.motor.stop()
+                elif stop == Stop.BRAKE:
+                    self.motor.brake()
+                return
+            yield
+
+    @perfilado("mueve")
+    def mueve(self, velocidad: int, angulo: int, *, stop: Stop = Stop.HOLD) -> bool:
+        # Como run_angle, pero acaba en cuanto se atasca.
+        # Devuelve True si ha sido un atasco y False si llegó al ángulo
+        for _ in self.vigila(velocidad, angulo, stop=stop):
+            self.robot.avanza_tareas()
+            wait(1)
+        return self.atasco
+
+
+class ColaBotones:
+    """
+    Convierte hub.buttons.pressed() en una cola de eventos por botón:
+    pulsación, pulsación larga y suelta. Los cambios se aceptan en cuanto
+    se leen y luego se ignoran durante el rebote, así la pulsación llega
+    sin retraso y sin repetidos. Se llama a lee() en cada vuelta del bucle
+    """
+    PULSA = 0
+    LARGA = 1
+    SUELTA = 2
+
+    def __init__(self, hub: PrimeHub, *, rebote: int = 20, larga: int = 1000):
+        self.hub = hub
+        self.rebote = rebote
+        self.larga = larga
+        self.cronometro = StopWatch()
+        # Lo último que devolvió pressed(), tal cual, para comparar sin
+        # hacer conjuntos en cada vuelta
+        self.leidos = ()
+        # Botones pulsados ya sin rebotes y cuándo cambiaron por última vez
+        self.pulsados = set()
+        self.cambio = -rebote
+        # Botón -> cuándo se pulsó, mientras no haya dado la pulsación larga
+        self.pulsado_en = {}
+        self.eventos = []
+
+    def lee(self):
+        # Devuelve el siguiente evento (tipo, botón) o None si no hay
+        ahora = self.cronometro.time()
+        if ahora - self.cambio >= self.rebote:
+            leidos = self.hub.buttons.pressed()
+            if leidos != self.leidos:
+                self.leidos = leidos
+                anteriores = self.pulsados
+                # Se actualiza antes de dar los eventos, así con la primera
+                # pulsación de un acorde ya se ven las dos teclas
+                self.pulsados = set(leidos)
+                if self.pulsados != anteriores:
+                    self.cambio = ahora
+                    for boton in self.pulsados - anteriores:
+                        self.pulsado_en[boton] = ahora
+                        self.eventos.append((self.PULSA, boton))
+                    for boton in anteriores - self.pulsados:
+                        self.pulsado_en.pop(boton, None)
+                        self.eventos.append((self.SUELTA, boton))
+        # Como mucho una pulsación larga por vuelta, así no hace falta copiar
+        # el diccionario para borrar mientras se recorre
+        larga = None
+        for boton in self.pulsado_en:
+            if ahora - self.pulsado_en[boton] >= self.larga:
+                larga = boton
+                break
+        if larga is not None:
+            del self.pulsado_en[larga]
+            self.eventos.append((self.LARGA, larga))
+        return self.eventos.pop(0) if self.eventos else None
+
+    def vacia(self):
+        # Después de una salida o de un submenú: lo que quede pendiente ya no
+        # vale, y lo que siga pulsado no cuenta como pulsación nueva ni larga
+        self.eventos = []
+        self.pulsado_en = {}
+        self.leidos = self.hub.buttons.pressed()
+        self.pulsados = set(self.leidos)
+        self.cambio = self.cronometro.time()
+
+    def espera_pulsacion(self, tarea=None):
+        # Espera a que se pulse un botón y lo devuelve. tarea se llama en cada
+        # vuelta mientras tanto
+        while True:
+            evento = self.lee()
+            if evento is not None and evento[0] == self.PULSA:
+                return evento[1]
+            if tarea is not None:
+                tarea()
+            wait(1)